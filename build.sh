@@ -14,6 +14,8 @@ fi
 # Install Python dependencies
 if [ -d "server" ]; then
   cd server && pip install -r requirements.txt
+  # gzip / brotli variants of the client build, served by Accept-Encoding
+  python static_assets.py ../client/dist
 else
   echo "Error: server directory not found"
   exit 1
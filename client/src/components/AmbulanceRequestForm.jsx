@@ -7,6 +7,7 @@ function AmbulanceRequestForm({ position, onRequestSubmit, onHospitalSelect }) {
   const [nearbyHospitals, setNearbyHospitals] = useState([]);
   const [favorites, setFavorites] = useState([]);
   const [searchTerm, setSearchTerm] = useState("");
+  const [relevance, setRelevance] = useState({});
   const [paymentMethod, setPaymentMethod] = useState("Cash");
   const [selectedHospital, setSelectedHospital] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
@@ -60,134 +61,42 @@ function AmbulanceRequestForm({ position, onRequestSubmit, onHospitalSelect }) {
         throw new Error("Invalid position data");
       }
       
-      const [lat, lng] = position;
       const radius = 10000;
       
-      const query = `
-        [out:json];
-        (
-          node["amenity"="hospital"](around:${radius},${lat},${lng});
-          way["amenity"="hospital"](around:${radius},${lat},${lng});
-          relation["amenity"="hospital"](around:${radius},${lat},${lng});
-          node["amenity"="clinic"](around:${radius},${lat},${lng});
-          way["amenity"="clinic"](around:${radius},${lat},${lng});
-          relation["amenity"="clinic"](around:${radius},${lat},${lng});
-          node["healthcare"="hospital"](around:${radius},${lat},${lng});
-          way["healthcare"="hospital"](around:${radius},${lat},${lng});
-          relation["healthcare"="hospital"](around:${radius},${lat},${lng});
-          node["healthcare"="centre"](around:${radius},${lat},${lng});
-          way["healthcare"="centre"](around:${radius},${lat},${lng});
-          relation["healthcare"="centre"](around:${radius},${lat},${lng});
-          node["healthcare"="clinic"](around:${radius},${lat},${lng});
-          way["healthcare"="clinic"](around:${radius},${lat},${lng});
-          relation["healthcare"="clinic"](around:${radius},${lat},${lng});
-        );
-        out center;
-      `;
-      
-      const response = await fetch("https://overpass-api.de/api/interpreter", {
-        method: "POST",
-        body: query
+      const toHospital = (hospital) => ({
+        id: hospital.osm_id ? `osm-${hospital.osm_id}` : `hospital-${hospital.id}`,
+        name: hospital.name,
+        type: hospital.type || 'medical',
+        address: hospital.address || "Address unavailable",
+        position: [hospital.latitude, hospital.longitude],
+        distance: hospital.distance.toFixed(1),
+        favorite: false
       });
       
-      if (response.ok) {
-        const data = await response.json();
-        
-        const hospitals = data.elements
-          .filter(item => item.tags && (item.tags.name || item.tags['name:en']))
-          .map((item, index) => {
-            const [itemLat, itemLng] = getCoordinates(item);
-            const name = item.tags.name || item.tags['name:en'] || `Medical Facility ${index + 1}`;
-            const type = item.tags.amenity || item.tags.healthcare || 'medical';
-            
-            return {
-              id: `osm-${item.id}`,
-              name: name,
-              type: type,
-              address: getAddress(item),
-              position: [itemLat, itemLng],
-              distance: calculateDistance(position, [itemLat, itemLng]),
-              favorite: false
-            };
-          });
-        
-        // Remove duplicates by name
-        const uniqueHospitals = removeDuplicates(hospitals, 'name');
-        
-        // Sort by distance
-        const sortedHospitals = uniqueHospitals.sort((a, b) => 
-          parseFloat(a.distance) - parseFloat(b.distance)
-        );
-        
-        setNearbyHospitals(sortedHospitals);
-      } else {
-        throw new Error("Failed to fetch nearby hospitals");
+      // Prefer the server-side hospital index; it answers in milliseconds
+      const indexed = await api.hospitals.nearby(position, radius).catch(() => []);
+      if (indexed && indexed.length > 0) {
+        setNearbyHospitals(indexed.map(toHospital));
+        return;
       }
+      
+      // Fall back to the server's cached Overpass proxy when the index has nothing for this area
+      let result = await api.hospitals.overpass(position, radius);
+      if (result.cache === "miss") {
+        // Cold tile: the server keeps fetching it in the background, so ask again shortly
+        await new Promise(resolve => setTimeout(resolve, 1500));
+        result = await api.hospitals.overpass(position, radius);
+      }
+      setNearbyHospitals(result.hospitals.map(toHospital));
     } catch (error) {
       setError("Failed to load hospitals. Please try again later.");
       console.error("Error fetching nearby hospitals:", error);
     } finally {
+      clearTimeout(fetchTimeout);
       setIsLoading(false);
     }
   };
   
-  const removeDuplicates = (array, key) => {
-    return array.filter((item, index, self) => 
-      index === self.findIndex((t) => t[key] === item[key])
-    );
-  };
-  
-  const getCoordinates = (item) => {
-    if (item.type === "node") {
-      return [item.lat, item.lon];
-    } else if (item.center) {
-      return [item.center.lat, item.center.lon];
-    } else {
-      return [0, 0]; // Fallback
-    }
-  };
-  
-  const getAddress = (item) => {
-    if (!item.tags) return "Address unavailable";
-    
-    const street = item.tags["addr:street"] || "";
-    const housenumber = item.tags["addr:housenumber"] || "";
-    const city = item.tags["addr:city"] || "";
-    
-    if (street || housenumber || city) {
-      return `${street} ${housenumber}, ${city}`.trim();
-    }
-    
-    return "Address unavailable";
-  };
-  
-  const calculateDistance = (point1, point2) => {
-    // Validate input points
-    if (!point1 || !point2 || !Array.isArray(point1) || !Array.isArray(point2) ||
-        point1.length !== 2 || point2.length !== 2 ||
-        isNaN(point1[0]) || isNaN(point1[1]) || isNaN(point2[0]) || isNaN(point2[1])) {
-      return "0.0";
-    }
-    
-    const [lat1, lon1] = point1;
-    const [lat2, lon2] = point2;
-    
-    const R = 6371;
-    const dLat = deg2rad(lat2 - lat1);
-    const dLon = deg2rad(lon2 - lon1);
-    const a = 
-      Math.sin(dLat/2) * Math.sin(dLat/2) +
-      Math.cos(deg2rad(lat1)) * Math.cos(deg2rad(lat2)) * 
-      Math.sin(dLon/2) * Math.sin(dLon/2); 
-    const c = 2 * Math.atan2(Math.sqrt(a), Math.sqrt(1-a)); 
-    const distance = R * c;
-    return distance.toFixed(1);
-  };
-  
-  const deg2rad = (deg) => {
-    return deg * (Math.PI/180);
-  };
-  
   const calculateETA = (distance) => {
     const timeInMinutes = Math.round((parseFloat(distance) / 60) * 60);
     return timeInMinutes < 1 ? 1 : timeInMinutes;
@@ -211,56 +120,32 @@ function AmbulanceRequestForm({ position, onRequestSubmit, onHospitalSelect }) {
     }
   };
   
-  const calculateRelevanceScore = (hospital, searchTerm) => {
-    const name = hospital.name.toLowerCase();
-    const search = searchTerm.toLowerCase();
-    
-    // Exact match gets highest score
-    if (name === search) return 100;
-    
-    // Contains full search term
-    if (name.includes(search)) return 80;
-    
-    // Check if it's a hospital or medical center
-    const isHospitalOrMedical = 
-      name.includes('hospital') || 
-      name.includes('medical') || 
-      name.includes('clinic') || 
-      name.includes('centre') || 
-      name.includes('center');
-    
-    if (isHospitalOrMedical) {
-      // Check if any word in the search term is in the name
-      const searchWords = search.split(' ');
-      for (const word of searchWords) {
-        if (word.length > 2 && name.includes(word)) {
-          return 60;
-        }
-      }
-      
-      // Check if any part of the search term matches
-      for (let i = 0; i < search.length - 2; i++) {
-        const part = search.substring(i, i + 3);
-        if (name.includes(part)) {
-          return 40;
-        }
-      }
-      
-      // It's a hospital/medical center but doesn't match the search term
-      return 20;
+  // The server scores the nearby hospitals' names against the search term
+  useEffect(() => {
+    if (!searchTerm || nearbyHospitals.length === 0) {
+      setRelevance({});
+      return;
     }
     
-    // Not a hospital/medical center and doesn't match
-    return 0;
-  };
+    const names = [...new Set(nearbyHospitals.map(hospital => hospital.name))].slice(0, 500);
+    const debounceTimer = setTimeout(() => {
+      api.hospitals.match(searchTerm, names)
+        .then(matches => setRelevance(
+          Object.fromEntries(matches.map(match => [match.name, match.score]))
+        ))
+        .catch(() => setRelevance({}));
+    }, 150);
+    
+    return () => clearTimeout(debounceTimer);
+  }, [searchTerm, nearbyHospitals]);
   
   const filteredHospitals = searchTerm ? 
     nearbyHospitals
+      .filter(hospital => relevance[hospital.name] !== undefined)
       .map(hospital => ({
         ...hospital,
-        relevance: calculateRelevanceScore(hospital, searchTerm)
+        relevance: relevance[hospital.name]
       }))
-      .filter(hospital => hospital.relevance > 0)
       .sort((a, b) => {
         // First sort by relevance
         if (b.relevance !== a.relevance) {
@@ -73,10 +73,12 @@ export const AuthProvider = ({ children }) => {
   };
 
   const saveTempRequest = (requestData) => {
+    // Keep one idempotency key with the request so submitting it again cannot create a duplicate
+    const request = { idempotencyKey: api.newIdempotencyKey(), ...requestData };
     // Save to state
-    setTempRequest(requestData);
+    setTempRequest(request);
     // Also save to localStorage as backup
-    localStorage.setItem('tempRequest', JSON.stringify(requestData));
+    localStorage.setItem('tempRequest', JSON.stringify(request));
   };
 
   const processTempRequest = async () => {
@@ -88,7 +90,8 @@ export const AuthProvider = ({ children }) => {
         await api.requests.create({
           hospital_name: savedRequest.hospital.name,
           payment_method: savedRequest.paymentMethod,
-          date: savedRequest.timestamp
+          date: savedRequest.timestamp,
+          idempotencyKey: savedRequest.idempotencyKey
         });
         
         // Clear the temporary request data
@@ -162,6 +162,7 @@ function Home() {
       const apiData = {
         hospital_name: data.hospital.name,
         payment_method: data.paymentMethod,
+        position: position,
         date: new Date().toLocaleString()
       };
       
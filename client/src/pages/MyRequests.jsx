@@ -2,9 +2,24 @@ import React, { useState, useEffect } from "react";
 import { useAuth } from "../context/AuthContext";
 import api from "../utils/api";
 
+// How often the newest rides are re-fetched when the server does not stream status updates
+const POLL_INTERVAL_MS = 15000;
+
+// Update known rides in place and put unseen ones (newest first) on top
+function mergeRides(current, rides) {
+  const byId = new Map(rides.map((ride) => [ride.id, ride]));
+  const known = new Set(current.map((req) => req.id));
+  return [
+    ...rides.filter((ride) => !known.has(ride.id)),
+    ...current.map((req) => (byId.has(req.id) ? { ...req, ...byId.get(req.id) } : req))
+  ];
+}
+
 function MyRequests() {
   const [myRequests, setMyRequests] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const { user } = useAuth();
 
@@ -14,8 +29,9 @@ function MyRequests() {
   
       try {
         setLoading(true);
-        const response = await api.requests.getAll();
-        setMyRequests(response);
+        const page = await api.rideHistory.getPage();
+        setMyRequests(page.rides);
+        setNextCursor(page.nextCursor);
       } catch (err) {
         console.error("Failed to fetch requests:", err);
         setError("Failed to load your requests. Please try again later.");
@@ -27,6 +43,55 @@ function MyRequests() {
     fetchRequests();
   }, [user]);
   
+  // Live status updates pushed by the server, or polled when it does not stream them
+  useEffect(() => {
+    if (!user) return;
+    
+    let poller = null;
+    const source = api.rideHistory.subscribe(
+      (ride) => setMyRequests((current) => mergeRides(current, [ride])),
+      () => {
+        poller = setInterval(async () => {
+          if (document.hidden) return;
+          try {
+            const rides = await api.requests.getAll();
+            setMyRequests((current) => mergeRides(current, rides));
+          } catch (err) {
+            console.error("Failed to refresh requests:", err);
+          }
+        }, POLL_INTERVAL_MS);
+      }
+    );
+    
+    return () => {
+      source.close();
+      clearInterval(poller);
+    };
+  }, [user]);
+  
+  // Older rides, one page at a time from where the last page ended
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await api.rideHistory.getPage(nextCursor);
+      // Skip rides a status update already put in the list
+      setMyRequests((current) => {
+        const known = new Set(current.map((req) => req.id));
+        return [...current, ...page.rides.filter((ride) => !known.has(ride.id))];
+      });
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error("Failed to fetch more requests:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+  
+  const formatStatus = (status) => {
+    if (!status) return "N/A";
+    return status.charAt(0) + status.slice(1).toLowerCase().replace("_", " ");
+  };
+  
   const formatDate = (dateString) => {
     if (!dateString) return "N/A";
     
@@ -72,6 +137,7 @@ function MyRequests() {
               <th>ID</th>
               <th>Hospital</th>
               <th>Payment</th>
+              <th>Status</th>
               <th>Date & Time</th>
             </tr>
           </thead>
@@ -81,6 +147,7 @@ function MyRequests() {
                 <td>{req.id}</td>
                 <td>{req.hospital_name}</td>
                 <td>{req.payment_method}</td>
+                <td>{formatStatus(req.status)}</td>
                 <td>{req.formatted_date || formatDate(req.date)}</td>
               </tr>
             ))}
@@ -91,6 +158,12 @@ function MyRequests() {
           You haven't made any ambulance requests yet.
         </div>
       )}
+
+      {nextCursor && (
+        <button className="load-more-btn" onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? "Loading..." : "Load more"}
+        </button>
+      )}
     </div>
   );
 }
@@ -1,7 +1,8 @@
 
 const API_URL = import.meta.env.VITE_API_URL || "";
 
-async function fetchApi(endpoint, options = {}) {
+// Resolves to the raw Response, for callers that need its headers; see fetchApi
+async function fetchResponse(endpoint, options = {}) {
   const url = `${API_URL}${endpoint}`;
   
   const headers = {
@@ -40,27 +41,96 @@ async function fetchApi(endpoint, options = {}) {
       throw new Error(errorData.error || `API error: ${response.status}`);
     }
     
-    return await response.json();
+    return response;
   } catch (error) {
     console.error("API request failed:", error);
     throw error;
   }
 }
 
+async function fetchApi(endpoint, options = {}) {
+  const response = await fetchResponse(endpoint, options);
+  return response && response.json();
+}
+
+function newIdempotencyKey() {
+  if (window.crypto && window.crypto.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+// POST with an Idempotency-Key, retrying network failures with the same key so a
+// request whose response was lost is answered from the server instead of repeated
+async function postIdempotent(endpoint, data, idempotencyKey = newIdempotencyKey(), attempts = 3) {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await fetchApi(endpoint, {
+        method: "POST",
+        headers: { "Idempotency-Key": idempotencyKey },
+        body: JSON.stringify(data)
+      });
+    } catch (error) {
+      // fetch only rejects with a TypeError when no response arrived at all
+      if (!(error instanceof TypeError) || attempt >= attempts) {
+        throw error;
+      }
+      await new Promise(resolve => setTimeout(resolve, 500 * 2 ** (attempt - 1)));
+    }
+  }
+}
+
 const api = {
+  newIdempotencyKey,
   rideHistory: {
     getAll: () => fetchApi("/ride_history"),
-    create: (historyData) => fetchApi("/ride_history", {
-      method: "POST",
-      body: JSON.stringify(historyData)
-    }),
+    // One page, newest first; nextCursor is null after the oldest ride
+    getPage: async (cursor = null, limit = 50) => {
+      const query = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
+      const response = await fetchResponse(`/ride_history?limit=${limit}${query}`);
+      if (!response) return { rides: [], nextCursor: null };
+      return { rides: await response.json(), nextCursor: response.headers.get("X-Next-Cursor") };
+    },
+    create: (historyData) => postIdempotent("/ride_history", historyData),
     getById: (id) => fetchApi(`/ride_history/${id}`),
     update: (id, data) => fetchApi(`/ride_history/${id}`, {
       method: "PATCH",
       body: JSON.stringify(data)
     }),
     delete: (id) => fetchApi(`/ride_history/${id}`, { method: "DELETE" }),
-    search: (query) => fetchApi(`/ride_history/search?search=${query}`)
+    search: (query) => fetchApi(`/ride_history/search?search=${query}`),
+    // EventSource cannot send headers, so the token goes in the query string.
+    // A server that does not stream answers 503; EventSource then stays closed
+    // instead of reconnecting, and onUnavailable lets the caller poll instead.
+    subscribe: (onStatus, onUnavailable) => {
+      const token = localStorage.getItem("token");
+      const source = new EventSource(`${API_URL}/ride_history/stream?jwt=${encodeURIComponent(token)}`);
+      source.addEventListener("status", (event) => onStatus(JSON.parse(event.data)));
+      source.addEventListener("error", () => {
+        if (source.readyState === EventSource.CLOSED && onUnavailable) {
+          onUnavailable();
+        }
+      });
+      return source;
+    }
+  },
+
+  hospitals: {
+    nearby: ([lat, lng], radius = 10000, limit = 20) =>
+      fetchApi(`/hospitals/nearby?lat=${lat}&lng=${lng}&radius=${radius}&limit=${limit}`),
+    search: (query, limit = 10) =>
+      fetchApi(`/hospitals/search?q=${encodeURIComponent(query)}&limit=${limit}`),
+    // Scores only the given names, e.g. the hospitals already shown near the user
+    match: (query, names) => fetchApi("/hospitals/search", {
+      method: "POST",
+      body: JSON.stringify({ q: query, names })
+    }),
+    overpass: ([lat, lng], radius = 10000) =>
+      fetchApi(`/hospitals/overpass?lat=${lat}&lng=${lng}&radius=${radius}`),
+    rank: (positions, options = {}) => fetchApi("/hospitals/rank", {
+      method: "POST",
+      body: JSON.stringify({ positions, ...options })
+    })
   },
 
   contactUs: {
@@ -80,6 +150,15 @@ const api = {
     remove: (data) => fetchApi("/favorites", {
       method: "DELETE",
       body: JSON.stringify(data)
+    }),
+    // Bulk sync in one request; both resolve to the resulting favorites list
+    replace: (hospitalNames) => fetchApi("/favorites", {
+      method: "PUT",
+      body: JSON.stringify({ hospital_names: hospitalNames })
+    }),
+    update: ({ add = [], remove = [] }) => fetchApi("/favorites", {
+      method: "PATCH",
+      body: JSON.stringify({ add, remove })
     })
   },
 
@@ -92,10 +171,11 @@ const api = {
         payment_method: requestData.payment_method || requestData.payment,
         date: new Date().toLocaleString()
       };
-      return fetchApi("/request-ambulance", {
-        method: "POST",
-        body: JSON.stringify(transformedData)
-      });
+      // Pickup location lets the dispatcher send the nearest ambulance
+      if (requestData.position) {
+        [transformedData.latitude, transformedData.longitude] = requestData.position;
+      }
+      return postIdempotent("/request-ambulance", transformedData, requestData.idempotencyKey);
     },
     update: (id, data) => fetchApi(`/ride_history/${id}`, {
       method: "PATCH",
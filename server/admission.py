@@ -0,0 +1,74 @@
+import threading
+import time
+
+from flask import g, request
+
+CRITICAL, NORMAL, LOW = "critical", "normal", "low"
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after=1):
+        super().__init__("Server is overloaded")
+        self.retry_after = retry_after
+
+
+def queue_wait_ms(header):
+    # X-Request-Start as set by nginx ("t=1700000000.123") or Heroku/Render (ms or µs since the epoch)
+    try:
+        started = float(header.strip().lstrip("t="))
+    except (AttributeError, ValueError):
+        return None
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max(0.0, (time.time() - started) * 1000)
+
+
+class AdmissionController:
+    """Sheds lower-priority requests first when the server falls behind.
+
+    Two signals are used. ``X-Request-Start`` (stamped by the proxy) says
+    how long a request queued for a free gunicorn worker: low-priority
+    requests are refused past ``shed_low_ms`` and normal ones past
+    ``shed_normal_ms``. With threaded or async workers, ``max_concurrent``
+    also caps requests in flight per worker, and low and normal traffic may
+    only fill ``low_share`` and ``normal_share`` of it. The rest is kept for
+    critical routes, which are never shed.
+    """
+
+    def __init__(self, shed_low_ms=500, shed_normal_ms=2000, max_concurrent=0, low_share=0.5, normal_share=0.8):
+        self.shed_ms = {LOW: shed_low_ms, NORMAL: shed_normal_ms}
+        self.limits = {LOW: max_concurrent * low_share, NORMAL: max_concurrent * normal_share,
+                       CRITICAL: max_concurrent}
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def priority(level):
+        def decorator(f):
+            f.admission_priority = level
+            return f
+        return decorator
+
+    def init_app(self, app):
+        @app.before_request
+        def admit():
+            view = app.view_functions.get(request.endpoint)
+            level = getattr(view, "admission_priority", NORMAL)
+            if level != CRITICAL:
+                waited = queue_wait_ms(request.headers.get("X-Request-Start"))
+                if waited is not None and waited > self.shed_ms[level]:
+                    raise Overloaded()
+            with self._lock:
+                if self.max_concurrent and level != CRITICAL and self.in_flight >= self.limits[level]:
+                    raise Overloaded()
+                self.in_flight += 1
+            g.admitted = True
+
+        @app.teardown_request
+        def release(error):
+            if g.pop("admitted", False):
+                with self._lock:
+                    self.in_flight -= 1
@@ -1,17 +1,51 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context, g
 from flask_cors import CORS
-from models import db, User, RideHistory, ContactUs, Favorite
+from database import database_url, engine_options, tune_engine, init_replica, read_replica
+from models import (db, User, RideHistory, ContactUs, Favorite, Hospital, RideStatusEnum, PubSubEvent, Ambulance,
+                    RateLimitBucket, RideRollup, Job)
+from spatial import HospitalIndex
+from ranking import HospitalRanker, DEFAULT_SPEED_KMH
+from name_search import NameSearchIndex, score_names, MAX_MATCH_NAMES
+from user_search import UserSearch, MAX_SEARCH_RESULTS, include_object
+from passwords import password_hasher, PasswordHashingBusy
+from user_cache import UserCache
+from serialization import OrjsonProvider, LOCAL_OFFSET
+from metrics import metrics
+from rate_limit import RateLimiter, RateLimited, DatabaseBucketStore
+from admission import AdmissionController, Overloaded, CRITICAL, LOW
+from idempotency import IdempotencyStore, KeyReused
+from response_cache import ResponseCache
+from static_assets import StaticAssets
+from rollups import RideRollups, MAX_STATS_RANGE, floor_hour, ceil_hour
+from group_commit import GroupCommitWriter
+from jobs import JobQueue
+from pubsub import InProcessBroker, DatabaseBroker
+from dispatch import Dispatcher
+from osm_import import load_hospitals
+from exports import EXPORT_FORMATS, stream_rows, parse_date_range
+from overpass import OverpassCache, HttpOverpassUpstream, FixtureUpstream, OVERPASS_URL
 from flask_migrate import Migrate
 from datetime import timedelta, datetime
 from functools import wraps
-from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, jwt_required
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, jwt_required, current_user
 import sqlalchemy
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import HTTPException
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
-from flask import send_from_directory
+import base64
+import json
+import multiprocessing
+import click
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///ambulance.db'
+app.json = OrjsonProvider(app)
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url(os.environ.get('DATABASE_URL', 'sqlite:///ambulance.db'))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+# Optional read-only replica that serves the heavy per-user GET endpoints
+app.config['SQLALCHEMY_REPLICA_URI'] = (database_url(os.environ['DATABASE_REPLICA_URL'])
+                                        if os.environ.get('DATABASE_REPLICA_URL') else None)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
 
@@ -20,7 +54,8 @@ CORS(app, resources={
     r"/*": {
         "origins": "*",  # Allow all origins temporarily for debugging
         "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization", "Accept"],
+        "allow_headers": ["Content-Type", "Authorization", "Accept", "Idempotency-Key"],
+        "expose_headers": ["X-Next-Cursor", "ETag", "Retry-After", "Idempotent-Replayed"],
         "supports_credentials": True
     }
 })
@@ -28,13 +63,215 @@ CORS(app, resources={
 # Use a fixed secret key for development
 app.config['JWT_SECRET_KEY'] = 'dev-secret-key'  # Replace with a secure key in production
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+app.config['OVERPASS_URL'] = os.environ.get('OVERPASS_URL', OVERPASS_URL)
+app.config['OVERPASS_FIXTURE'] = os.environ.get('OVERPASS_FIXTURE')  # local Overpass JSON dump used instead of the network
+app.config['OVERPASS_CACHE_PATH'] = os.environ.get('OVERPASS_CACHE_PATH')
+app.config['OVERPASS_CACHE_TTL'] = int(os.environ.get('OVERPASS_CACHE_TTL', 3600))
+app.config['OVERPASS_CACHE_STALE_TTL'] = int(os.environ.get('OVERPASS_CACHE_STALE_TTL', 86400))
+app.config['OVERPASS_CACHE_ERROR_TTL'] = int(os.environ.get('OVERPASS_CACHE_ERROR_TTL', 30))
+# Batch concurrent ride inserts into one transaction every few milliseconds
+app.config['GROUP_COMMIT_ENABLED'] = os.environ.get('GROUP_COMMIT_ENABLED', 'false').lower() == 'true'
+app.config['GROUP_COMMIT_WINDOW_MS'] = float(os.environ.get('GROUP_COMMIT_WINDOW_MS', 5))
+
+# "memory" keeps ride status events inside one process; "database" shares them across gunicorn workers
+app.config['PUBSUB_BACKEND'] = os.environ.get('PUBSUB_BACKEND', 'memory')
+# Serve /ride_history/stream; gunicorn.conf.py turns it off unless workers can hold idle connections
+app.config['RIDE_STREAM_ENABLED'] = os.environ.get('RIDE_STREAM_ENABLED', 'true').lower() == 'true'
+# Request / SQL timing and the /metrics endpoint; nothing is hooked in while disabled
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 250))
+# Per-client token buckets for abuse-prone routes; "database" shares them across gunicorn workers
+app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', 'false').lower() == 'true'
+app.config['RATE_LIMIT_BACKEND'] = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+app.config['RATE_LIMIT_AUTH'] = os.environ.get('RATE_LIMIT_AUTH', '10/minute')
+app.config['RATE_LIMIT_CONTACT_US'] = os.environ.get('RATE_LIMIT_CONTACT_US', '5/minute')
+app.config['RATE_LIMIT_USER_SEARCH'] = os.environ.get('RATE_LIMIT_USER_SEARCH', '30/minute')
+# Reverse proxies in front of the app whose X-Forwarded-* headers are trusted (0 = none)
+app.config['TRUSTED_PROXY_COUNT'] = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+# Load shedding: queue time (from the proxy's X-Request-Start) past which low / normal priority
+# requests are refused, and the in-flight cap per worker for threaded workers (0 = no cap)
+app.config['ADMISSION_SHED_LOW_MS'] = float(os.environ.get('ADMISSION_SHED_LOW_MS', 500))
+app.config['ADMISSION_SHED_NORMAL_MS'] = float(os.environ.get('ADMISSION_SHED_NORMAL_MS', 2000))
+app.config['ADMISSION_MAX_CONCURRENT'] = int(os.environ.get('ADMISSION_MAX_CONCURRENT', 0))
+# Rendered favorites / ride history pages kept per user until a write invalidates them. Only safe
+# when every worker hears about writes, so it is on by default only with PUBSUB_BACKEND=database
+app.config['RESPONSE_CACHE_ENABLED'] = os.environ.get(
+    'RESPONSE_CACHE_ENABLED', str(app.config['PUBSUB_BACKEND'] == 'database')
+).lower() == 'true'
+app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 30))
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 10000))
+# Background jobs: how long a worker may hold a job before it is handed out again, and tries per job
+app.config['JOB_VISIBILITY_TIMEOUT'] = int(os.environ.get('JOB_VISIBILITY_TIMEOUT', 60))
+app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+# Comma-separated user ids allowed to export other users' rides and the contact messages
+app.config['OPS_USER_IDS'] = frozenset(int(user_id) for user_id in os.environ.get('OPS_USER_IDS', '').split(',')
+                                       if user_id.strip())
+# Vite build of the React client, indexed once at startup
+app.config['CLIENT_DIST_DIR'] = os.environ.get('CLIENT_DIST_DIR', os.path.join(app.root_path, '..', 'client', 'dist'))
+
+# Password hashing algorithm and cost, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+# Existing hashes are migrated to this method the next time their owner logs in.
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 16))
+password_hasher.configure(
+    method=app.config['PASSWORD_HASH_METHOD'],
+    max_workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_pending=app.config['PASSWORD_HASH_MAX_PENDING']
+)
 jwt = JWTManager(app)
 db.init_app(app)
-migrate = Migrate(app, db)
+migrate = Migrate(app, db, include_object=include_object)
+
+# In-process spatial index, ranking arrays and name search index of hospitals, rebuilt from the database at startup
+hospital_index = HospitalIndex()
+hospital_ranker = HospitalRanker()
+hospital_names = NameSearchIndex()
+
+# Shared cache in front of Overpass for areas the local index does not cover yet
+overpass_cache = OverpassCache(
+    FixtureUpstream(app.config['OVERPASS_FIXTURE']) if app.config['OVERPASS_FIXTURE']
+    else HttpOverpassUpstream(app.config['OVERPASS_URL']),
+    ttl=app.config['OVERPASS_CACHE_TTL'],
+    stale_ttl=app.config['OVERPASS_CACHE_STALE_TTL'],
+    error_ttl=app.config['OVERPASS_CACHE_ERROR_TTL'],
+    persist_path=app.config['OVERPASS_CACHE_PATH']
+)
+
+def reload_hospitals():
+    hospitals = Hospital.query.all()
+    hospital_index.load(hospitals)
+    hospital_ranker.load(hospitals)
+    hospital_names.load(hospitals)
+
+# Full-text (SQLite FTS5) or trigram (Postgres) index over user names
+user_search = UserSearch(User)
+# Hourly ride counts per hospital and payment method behind the /stats routes
+ride_rollups = RideRollups(RideRollup, RideHistory)
+
+group_commit = None
+limiter = RateLimiter()
+idempotency = IdempotencyStore()
+admission = AdmissionController(shed_low_ms=app.config['ADMISSION_SHED_LOW_MS'],
+                                shed_normal_ms=app.config['ADMISSION_SHED_NORMAL_MS'],
+                                max_concurrent=app.config['ADMISSION_MAX_CONCURRENT'])
+admission.init_app(app)
+response_cache = ResponseCache(max_entries=app.config['RESPONSE_CACHE_SIZE'], ttl=app.config['RESPONSE_CACHE_TTL'])
+# Deferred work (contact messages) queued in the database for `flask jobs-worker`
+job_queue = JobQueue(Job.__table__, visibility_timeout=app.config['JOB_VISIBILITY_TIMEOUT'],
+                     max_attempts=app.config['JOB_MAX_ATTEMPTS'])
+static_assets = StaticAssets(app.config['CLIENT_DIST_DIR'])
+static_assets.load()
+
+# Behind a proxy the socket address is the proxy's, which would put every client in one
+# per-IP rate limit bucket; take the client address the trusted proxies forwarded instead
+if app.config['TRUSTED_PROXY_COUNT']:
+    hops = app.config['TRUSTED_PROXY_COUNT']
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
 
 # Add this to create tables if they don't exist
 with app.app_context():
+    tune_engine(db.engine)
+    init_replica(app)
+    if app.config['METRICS_ENABLED']:
+        engines = [e for e in (db.engine, app.extensions.get('db_replica')) if e is not None]
+        metrics.init_app(app, engines, slow_query_ms=app.config['SLOW_QUERY_MS'])
+    if app.config['GROUP_COMMIT_ENABLED'] and os.environ.get('GUNICORN_WORKER_CLASS') == 'sync':
+        # One request at a time per process: every batch would be a single row paying the window
+        app.logger.warning("GROUP_COMMIT_ENABLED is ignored on sync workers; use gthread or gevent")
+    elif app.config['GROUP_COMMIT_ENABLED']:
+        group_commit = GroupCommitWriter(db.engine, window=app.config['GROUP_COMMIT_WINDOW_MS'] / 1000)
+    # Ride status changes are pushed to subscribers through this broker
+    ride_events = (DatabaseBroker(db.engine, PubSubEvent.__table__)
+                   if app.config['PUBSUB_BACKEND'] == 'database' else InProcessBroker())
+    response_cache.attach(ride_events)
+    response_cache.enabled = app.config['RESPONSE_CACHE_ENABLED']
+    job_queue.engine = db.engine
+    limiter.enabled = app.config['RATE_LIMIT_ENABLED']
+    if app.config['RATE_LIMIT_BACKEND'] == 'database':
+        limiter.store = DatabaseBucketStore(db.engine, RateLimitBucket.__table__)
     db.create_all()
+    user_search.setup(db.engine)
+    ride_rollups.setup(db.engine)
+    reload_hospitals()
+
+# ---------------- JWT IDENTITY ----------------
+# Authenticated requests resolve their user from a process-local cache instead of the database
+user_cache = UserCache()
+user_cache.watch(User)
+
+@jwt.user_lookup_loader
+def load_current_user(jwt_header, jwt_data):
+    return user_cache.get(int(jwt_data['sub']), lambda user_id: db.session.get(User, user_id))
+
+@jwt.user_lookup_error_loader
+def handle_user_lookup_error(jwt_header, jwt_data):
+    return jsonify({"error": "User not found"}), 404
+
+# ---------------- CLI COMMANDS ----------------
+@app.cli.command('import-hospitals')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--replace', is_flag=True, help='Delete existing hospitals before importing.')
+def import_hospitals(path, replace):
+    """Bulk import hospitals from an offline Overpass JSON or GeoJSON extract."""
+    if replace:
+        db.session.query(Hospital).delete()
+        existing = set()
+    else:
+        existing = {osm_id for (osm_id,) in db.session.query(Hospital.osm_id) if osm_id}
+
+    batch = []
+    imported = 0
+    for row in load_hospitals(path):
+        if row['osm_id'] in existing:
+            continue
+        batch.append(row)
+        if len(batch) >= 1000:
+            db.session.execute(sqlalchemy.insert(Hospital), batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(sqlalchemy.insert(Hospital), batch)
+        imported += len(batch)
+    db.session.commit()
+
+    reload_hospitals()
+    click.echo(f"Imported {imported} hospitals ({len(hospital_index)} indexed)")
+
+@app.cli.command('dispatch-worker')
+@click.option('--interval', default=1.0, help='Seconds between dispatch cycles when idle.')
+@click.option('--batch-size', default=200, help='Pending rides matched per cycle.')
+def dispatch_worker(interval, batch_size):
+    """Continuously assign pending rides to the nearest available ambulances."""
+    click.echo(f"Dispatching every {interval}s, up to {batch_size} rides per cycle")
+    Dispatcher(on_dispatch=publish_ride, batch_size=batch_size).run_forever(interval)
+
+@app.cli.command('jobs-worker')
+@click.option('--processes', default=1, help='Worker processes to run.')
+@click.option('--interval', default=1.0, help='Seconds between polls when no job is due.')
+def jobs_worker(processes, interval):
+    """Run queued background jobs, such as saving contact messages."""
+    click.echo(f"Running jobs ({', '.join(sorted(job_queue.handlers))}) in {processes} process(es)")
+    if processes == 1:
+        job_queue.run_forever(interval)
+        return
+    # Forked workers must not share the parent's pooled connections
+    db.engine.dispose()
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=job_queue.run_forever, args=(interval,), daemon=True)
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+@app.cli.command('backfill-rollups')
+@click.option('--since', type=datetime.fromisoformat, help='Only recount rides from this UTC time on.')
+def backfill_rollups(since):
+    """Recount the /stats ride rollups from ride_history."""
+    with db.engine.begin() as conn:
+        counted = ride_rollups.backfill(conn, since)
+    click.echo(f"Counted {counted} rides" + (f" since {floor_hour(since).isoformat()}" if since else ""))
 
 # ---------------- VALIDATION DECORATOR ----------------
 def validate_json(required_fields=None, optional_fields=None):
@@ -61,15 +298,123 @@ def validate_json(required_fields=None, optional_fields=None):
         return wrapped
     return decorator
 
+def is_ops_user():
+    return get_jwt_identity() in app.config['OPS_USER_IDS']
+
+# Limit a view to OPS_USER_IDS; place it below @jwt_required
+def ops_required(f):
+    @wraps(f)
+    def wrapped(*args, **kwargs):
+        if not is_ops_user():
+            return jsonify({"error": "Only ops users can do this"}), 403
+        return f(*args, **kwargs)
+    return wrapped
+
+# ---------------- PAGINATION HELPERS ----------------
+def encode_cursor(date, row_id):
+    raw = f"{date.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    # Raises ValueError (binascii and unicode errors included) for a malformed cursor
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    date, row_id = raw.split('|')
+    return datetime.fromisoformat(date), int(row_id)
+
+def export_response(statement, name):
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported export format: {export_format}"}), 400
+
+    rows = stream_rows(db.session, statement, export_format)
+    return Response(
+        stream_with_context(rows),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={name}.{export_format}"}
+    )
+
+# ---------------- WRITE HELPERS ----------------
+def save_ride_history(**values):
+    # Goes through the group-commit writer when enabled, otherwise a plain add + commit.
+    # Returns (ride, created): a retry whose idempotency key was already used by another
+    # worker gets the ride that request created instead of a duplicate, and a different
+    # request reusing the key raises KeyReused.
+    try:
+        if group_commit is None:
+            ride_history = RideHistory(**values)
+            db.session.add(ride_history)
+            db.session.commit()
+            return ride_history, True
+        # The writer takes its connection from the same pool, so hand this request's back
+        # before waiting on it; with gevent workers, hundreds of requests could be waiting
+        # at once, each holding a connection from its user lookup, and starve the writer
+        db.session.close()
+        return RideHistory(**group_commit.submit(RideHistory.__table__, values)), True
+    except IntegrityError:
+        db.session.rollback()
+        if not values.get('idempotency_key'):
+            raise
+        existing = RideHistory.query.filter_by(user_id=values['user_id'],
+                                               idempotency_key=values['idempotency_key']).first()
+        if existing is None:
+            raise
+        if existing.idempotency_fingerprint != values.get('idempotency_fingerprint'):
+            raise KeyReused()
+        return existing, False
+
+# Most hospitals a favorites sync may name in one request
+MAX_FAVORITES_BATCH = 500
+
+def insert_favorites(user_id, names):
+    # One INSERT ... ON CONFLICT DO NOTHING: names the user already has are skipped by the
+    # database, so there is no SELECT first and no race on _user_hospital_uc
+    rows = [{"user_id": user_id, "hospital_name": name} for name in names]
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        module = sqlite if dialect == 'sqlite' else postgresql
+        return module.insert(Favorite).values(rows).on_conflict_do_nothing()
+    return sqlalchemy.insert(Favorite).values(rows)
+
+def publish_ride(ride_history):
+    # Owners follow their own rides; "rides" carries every change for dispatch screens
+    response_cache.invalidate(ride_history.user_id, 'ride_history')
+    payload = ride_history.to_dict()
+    ride_events.publish(f"user:{ride_history.user_id}", payload)
+    ride_events.publish("rides", payload)
+
 # ---------------- GENERAL ERROR HANDLING ----------------
+@app.errorhandler(PasswordHashingBusy)
+def handle_password_hashing_busy(error):
+    db.session.rollback()
+    return jsonify({"error": "Server is busy, please try again shortly"}), 503, {"Retry-After": "1"}
+
+@app.errorhandler(RateLimited)
+def handle_rate_limited(error):
+    return (jsonify({"error": "Too many requests, please slow down"}), 429,
+            {"Retry-After": str(max(1, int(error.retry_after + 0.999)))})
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(error):
+    return jsonify({"error": "Server is busy, please try again shortly"}), 503, {"Retry-After": str(error.retry_after)}
+
 @app.errorhandler(Exception)
 def handle_general_error(error):
+    metrics.record_exception(error)
+    if not isinstance(error, HTTPException):
+        app.logger.error("Unhandled error on %s %s", request.method, request.path, exc_info=error)
     # Specific error handling for database-related issues
     if isinstance(error, sqlalchemy.exc.SQLAlchemyError):
         return jsonify({"error": "Database error", "details": str(error)}), 500
     return jsonify({"error": "An unexpected error occurred", "details": str(error)}), 500
 
 
+# --------------------- METRICS ROUTES ---------------------
+# Prometheus scrape target, aggregated across gunicorn workers
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return metrics.exposition()
 
 # --------------------- USER ROUTES ---------------------
 @app.route('/users', methods=['POST'])
@@ -95,16 +440,18 @@ def create_user():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/user', methods=['GET'])
+@admission.priority(LOW)
 @jwt_required()
+@limiter.limit('user_search', app.config['RATE_LIMIT_USER_SEARCH'], per='user')
 def get_users():
     search_query = request.args.get('search', '', type=str)
-    
-    query = User.query
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    offset = min(max(request.args.get('offset', 0, type=int), 0), MAX_SEARCH_RESULTS)
     
     if search_query:
-        query = query.filter(User.name.contains(search_query))
-    
-    users = query.all()
+        users = user_search.search(db.session, search_query, limit=limit, offset=offset)
+    else:
+        users = User.query.order_by(User.id).limit(limit).offset(offset).all()
     
     if not users:
         return jsonify({"error": "No users found matching the search criteria"}), 404
@@ -113,6 +460,7 @@ def get_users():
 
 # --------------------- AUTH ROUTES ---------------------
 @app.route('/login', methods=['POST'])
+@limiter.limit('login', app.config['RATE_LIMIT_AUTH'])
 @validate_json(required_fields=['email', 'password'])
 def login():
     data = request.get_json()
@@ -120,6 +468,11 @@ def login():
     
     if not user or not user.check_password(data['password']):
         return jsonify({"error": "Invalid email or password"}), 401
+
+    # Transparently move the stored hash to the configured algorithm and cost
+    if password_hasher.needs_rehash(user.password_hash):
+        user.set_password(data['password'])
+        db.session.commit()
     
     # Create access token
     access_token = create_access_token(identity=user.id)
@@ -132,15 +485,11 @@ def login():
 @app.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-        
-    return jsonify(user.to_dict()), 200
+    # Missing users are rejected by the user lookup loader before we get here
+    return jsonify(current_user.to_dict()), 200
 
 @app.route('/signup', methods=['POST'])
+@limiter.limit('signup', app.config['RATE_LIMIT_AUTH'])
 @validate_json(required_fields=['name', 'email', 'password'])
 def signup():
     data = request.get_json()
@@ -175,34 +524,146 @@ def signup():
 # --------------------- RIDE HISTORY ROUTES ---------------------
 @app.route('/ride_history', methods=['POST'])
 @jwt_required()
+@idempotency.idempotent
 @validate_json(required_fields=['hospital_name', 'payment', 'status'])
 def create_ride_history():
     data = request.get_json()
     user_id = get_jwt_identity()
 
-    ride_history = RideHistory(
-        user_id=user_id,
-        hospital_name=data['hospital_name'],
-        payment_method=data['payment'],
-        status=data['status']
-    )
-    
     try:
-        db.session.add(ride_history)
-        db.session.commit()
+        ride_history, created = save_ride_history(
+            user_id=user_id,
+            hospital_name=data['hospital_name'],
+            payment_method=data['payment'],
+            status=RideStatusEnum[data['status']],
+            idempotency_key=g.get('idempotency_key'),
+            idempotency_fingerprint=g.get('idempotency_fingerprint')
+        )
+        if created:
+            publish_ride(ride_history)
         return jsonify(ride_history.to_dict()), 201
+    except KeyReused:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 @app.route('/ride_history', methods=['GET'])
 @jwt_required()
+@response_cache.cached('ride_history')
+@read_replica
 def get_ride_history():
     user_id = get_jwt_identity()
-    history = RideHistory.query.filter_by(user_id=user_id).all()
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    cursor = request.args.get('cursor')
+
+    # Newest first, keyset-paginated on (date, id) so every page is an index range scan
+    # Plain column tuples rather than ORM objects: nothing here is modified
+    statement = sqlalchemy.select(*RideHistory.dict_columns()).where(RideHistory.user_id == user_id)
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        # The plain date bound lets the (user_id, date) index seek straight to the cursor
+        statement = statement.where(
+            RideHistory.date <= cursor_date,
+            sqlalchemy.or_(RideHistory.date < cursor_date, RideHistory.id < cursor_id)
+        )
+    statement = statement.order_by(RideHistory.date.desc(), RideHistory.id.desc()).limit(limit + 1)
+    history = db.session.execute(statement).all()
 
     # Return empty array instead of error when no history found
-    return jsonify([h.to_dict() for h in history])
+    response = jsonify([RideHistory.row_to_dict(h) for h in history[:limit]])
+    if len(history) > limit:
+        last = history[limit - 1]
+        response.headers['X-Next-Cursor'] = encode_cursor(last.date, last.id)
+    return response
+
+# Move a ride through its status state machine
+@app.route('/ride_history/<int:ride_id>', methods=['PATCH'])
+@admission.priority(CRITICAL)
+@jwt_required()
+@validate_json(required_fields=['status'])
+def update_ride_status(ride_id):
+    data = request.get_json()
+    ride_history = db.session.get(RideHistory, ride_id)
+    if not ride_history or (ride_history.user_id != get_jwt_identity() and not is_ops_user()):
+        return jsonify({"error": "Ride not found"}), 404
+
+    # Patients may only cancel; every other step belongs to the dispatcher and the crew,
+    # or a ride could skip past PENDING without an ambulance ever being assigned
+    status = RideStatusEnum[data['status']]
+    if status != RideStatusEnum.CANCELLED and not is_ops_user():
+        return jsonify({"error": "Only ops users can move a ride to " + status.name}), 403
+
+    try:
+        ride_history.transition_to(status)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+    publish_ride(ride_history)
+    return jsonify(ride_history.to_dict()), 200
+
+# Push the user's ride status changes as Server-Sent Events. EventSource cannot
+# set headers, so the token may also come in the ?jwt= query parameter.
+@app.route('/ride_history/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_ride_status():
+    # Refused before it can pin a worker; EventSource gives up on a non-200 and the client polls
+    if not app.config['RIDE_STREAM_ENABLED']:
+        return jsonify({"error": "Ride status streaming is disabled; poll GET /ride_history instead"}), 503
+
+    subscription = ride_events.subscribe(f"user:{get_jwt_identity()}")
+
+    def events():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                message = subscription.get(timeout=15)
+                if message is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: status\ndata: {json.dumps(message[1])}\n\n"
+        finally:
+            subscription.close()
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Stream ride history as NDJSON or CSV without loading it into memory
+@app.route('/ride_history/export', methods=['GET'])
+@admission.priority(LOW)
+@jwt_required()
+def export_ride_history():
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError:
+        return jsonify({"error": "'start' and 'end' must be ISO dates"}), 400
+
+    # Users export their own rides; other accounts (?user_id=) or everyone (?all=true) is for ops only
+    export_all = request.args.get('all', 'false').lower() == 'true'
+    user_id = request.args.get('user_id', get_jwt_identity(), type=int)
+    if (export_all or user_id != get_jwt_identity()) and not is_ops_user():
+        return jsonify({"error": "Only ops users can export other users' rides"}), 403
+
+    statement = sqlalchemy.select(
+        RideHistory.id, RideHistory.user_id, RideHistory.hospital_name,
+        RideHistory.payment_method, RideHistory.date
+    ).order_by(RideHistory.id)
+    if not export_all:
+        statement = statement.where(RideHistory.user_id == user_id)
+    if start:
+        statement = statement.where(RideHistory.date >= start)
+    if end:
+        statement = statement.where(RideHistory.date < end)
+
+    return export_response(statement, 'ride_history')
 
 # --------------------- FAVORITES ROUTES ---------------------
 
@@ -214,19 +675,16 @@ def add_favorite():
     data = request.get_json()
     user_id = get_jwt_identity()
 
-    # Check if the hospital is already in the favorites
-    existing_favorite = Favorite.query.filter_by(user_id=user_id, hospital_name=data['hospital_name']).first()
-    if existing_favorite:
-        return jsonify({"error": "Hospital already in favorites"}), 400
-
-    favorite = Favorite(
-        user_id=user_id,
-        hospital_name=data['hospital_name']
-    )
-    
     try:
-        db.session.add(favorite)
+        favorite_id = db.session.execute(
+            insert_favorites(user_id, [data['hospital_name']]).returning(Favorite.id)
+        ).scalar()
+        if favorite_id is None:
+            db.session.rollback()
+            return jsonify({"error": "Hospital already in favorites"}), 400
         db.session.commit()
+        response_cache.invalidate(user_id, 'favorites')
+        favorite = Favorite(id=favorite_id, user_id=user_id, hospital_name=data['hospital_name'])
         return jsonify(favorite.to_dict()), 201
     except IntegrityError:
         db.session.rollback()
@@ -238,6 +696,8 @@ def add_favorite():
 # Get all favorites for the logged-in user
 @app.route('/favorites', methods=['GET'])
 @jwt_required()
+@response_cache.cached('favorites')
+@read_replica
 def get_favorites():
     user_id = get_jwt_identity()
     favorites = Favorite.query.filter_by(user_id=user_id).all()
@@ -265,74 +725,390 @@ def remove_favorite():
     try:
         db.session.delete(favorite_to_remove)
         db.session.commit()
+        response_cache.invalidate(user_id, 'favorites')
         return jsonify({"message": "Favorite hospital removed successfully"}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+def favorite_names(data, field):
+    # A JSON list of hospital names -> list without duplicates; raises ValueError
+    names = data.get(field, [])
+    if not isinstance(names, list) or not all(isinstance(name, str) and 0 < len(name.strip()) <= 100
+                                              for name in names):
+        raise ValueError(f"'{field}' must be a list of hospital names of 1-100 characters")
+    return list(dict.fromkeys(name.strip() for name in names))
+
+def sync_favorites(user_id, add, remove=None, keep_only=None):
+    # Inserts `add`, then deletes `remove` (or everything not in `keep_only`) in one
+    # transaction, and returns the resulting favorites
+    if len(set(add) | set(remove or ()) | set(keep_only or ())) > MAX_FAVORITES_BATCH:
+        return jsonify({"error": f"At most {MAX_FAVORITES_BATCH} hospitals per request"}), 400
+
+    try:
+        if add:
+            db.session.execute(insert_favorites(user_id, add))
+        stale = sqlalchemy.delete(Favorite).where(Favorite.user_id == user_id)
+        if keep_only is not None:
+            db.session.execute(stale.where(Favorite.hospital_name.not_in(keep_only)))
+        elif remove:
+            db.session.execute(stale.where(Favorite.hospital_name.in_(remove)))
+        # Rendered before the commit, which would expire every row and reload them one by one
+        favorites = [f.to_dict() for f in Favorite.query.filter_by(user_id=user_id).order_by(Favorite.id)]
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    response_cache.invalidate(user_id, 'favorites')
+    return jsonify(favorites)
+
+# Replace the user's favorites with exactly the given hospitals
+@app.route('/favorites', methods=['PUT'])
+@jwt_required()
+@validate_json(required_fields=['hospital_names'])
+def replace_favorites():
+    try:
+        names = favorite_names(request.get_json(), 'hospital_names')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return sync_favorites(get_jwt_identity(), add=names, keep_only=names)
+
+# Add and remove several favorites in one request
+@app.route('/favorites', methods=['PATCH'])
+@jwt_required()
+@validate_json()
+def update_favorites():
+    data = request.get_json()
+    try:
+        add, remove = favorite_names(data, 'add'), favorite_names(data, 'remove')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if set(add) & set(remove):
+        return jsonify({"error": "A hospital cannot be both added and removed"}), 400
+    return sync_favorites(get_jwt_identity(), add=add, remove=remove)
+
+
+# --------------------- HOSPITAL ROUTES ---------------------
+@app.route('/hospitals/nearby', methods=['GET'])
+def get_nearby_hospitals():
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None:
+        return jsonify({"error": "Query parameters 'lat' and 'lng' are required"}), 400
+
+    # radius in meters, like the Overpass "around" filter
+    radius = min(max(request.args.get('radius', 10000, type=float), 0), 100000)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+
+    return jsonify(hospital_index.nearby(lat, lng, radius_km=radius / 1000, limit=limit))
+
+# Autocomplete hospital names with prefix and typo-tolerant trigram matching
+@app.route('/hospitals/search', methods=['GET'])
+def search_hospitals():
+    query = request.args.get('q', '', type=str)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+
+    if not query.strip():
+        return jsonify([])
+    return jsonify(hospital_names.search(query, limit=limit))
+
+# Score the caller's own candidates (e.g. the hospitals near the user) against a query
+@app.route('/hospitals/search', methods=['POST'])
+@validate_json(required_fields=['q', 'names'])
+def match_hospital_names():
+    data = request.get_json()
+    names = data['names']
+    if (not isinstance(data['q'], str) or not isinstance(names, list) or len(names) > MAX_MATCH_NAMES
+            or not all(isinstance(name, str) for name in names)):
+        return jsonify({"error": f"'q' must be a string and 'names' a list of up to {MAX_MATCH_NAMES} strings"}), 400
+    return jsonify(score_names(data['q'], names))
+
+# Proxy Overpass lookups through the tile cache
+@app.route('/hospitals/overpass', methods=['GET'])
+def get_overpass_hospitals():
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None:
+        return jsonify({"error": "Query parameters 'lat' and 'lng' are required"}), 400
+    radius = min(max(request.args.get('radius', 10000, type=float), 0), 50000)
+
+    hospitals, state = overpass_cache.lookup(lat, lng, radius)
+    if state == "error":
+        return jsonify({"error": "Hospital lookup failed, please try again"}), 502
+    return jsonify({"hospitals": hospitals, "cache": state})
+
+# Rank hospitals by ETA for one or many positions in a single vectorized pass
+@app.route('/hospitals/rank', methods=['POST'])
+@validate_json(required_fields=['positions'])
+def rank_hospitals():
+    data = request.get_json()
+    positions = data['positions']
+
+    if (not isinstance(positions, list) or not positions or len(positions) > 1000 or
+            not all(isinstance(p, (list, tuple)) and len(p) == 2 for p in positions)):
+        return jsonify({"error": "'positions' must be a list of 1 to 1000 [lat, lng] pairs"}), 400
+
+    try:
+        limit = min(max(int(data.get('limit', 10)), 1), 1000)
+        radius = data.get('radius')
+        radius_km = float(radius) / 1000 if radius is not None else None
+        speed_kmh = float(data.get('speed_kmh', DEFAULT_SPEED_KMH))
+        if speed_kmh <= 0:
+            raise ValueError
+        rankings = hospital_ranker.rank(positions, limit=limit, radius_km=radius_km, speed_kmh=speed_kmh)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid position, limit, radius or speed_kmh value"}), 400
+
+    return jsonify({"rankings": rankings})
+
 
 # --------------------- CONTACT US ROUTES ---------------------
 @app.route('/contact_us', methods=['POST'])
+@admission.priority(LOW)
+@limiter.limit('contact_us', app.config['RATE_LIMIT_CONTACT_US'])
 @validate_json(required_fields=['name', 'email', 'message'])
 def contact_us():
     data = request.get_json()
 
-    contact_message = ContactUs(
-        name=data['name'],
-        email=data['email'],
-        phone_number=data['phone_number'],
-        message=data['message']  
-    )
-    
+    # Saved by a jobs worker; the client only waits for the job to be queued
+    payload = {
+        "name": data['name'],
+        "email": data['email'],
+        "phone_number": data.get('phone_number') or "",  # the column is NOT NULL; don't queue a job bound to fail
+        "message": data['message'],
+        "created_at": datetime.utcnow().isoformat()
+    }
+
     try:
-        db.session.add(contact_message)
+        job_id = job_queue.enqueue(db.session, 'contact_us', payload)
         db.session.commit()
-        return jsonify(contact_message.to_dict()), 201
+        return jsonify({"message": "Your message has been received", "job_id": job_id}), 202
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+@job_queue.task('contact_us')
+def save_contact_message(conn, payload):
+    conn.execute(sqlalchemy.insert(ContactUs).values(
+        name=payload['name'],
+        email=payload['email'],
+        phone_number=payload['phone_number'],
+        message=payload['message'],
+        created_at=datetime.fromisoformat(payload['created_at'])
+    ))
+
 @app.route('/contact_us', methods=['GET'])
+@admission.priority(LOW)
 def get_contact_messages():
     contact_messages = ContactUs.query.all()
 
     # Return empty array instead of error when no contact messages found
     return jsonify([c.to_dict() for c in contact_messages])
 
+# Stream contact messages as NDJSON or CSV without loading them into memory
+@app.route('/contact_us/export', methods=['GET'])
+@admission.priority(LOW)
+@jwt_required()
+def export_contact_messages():
+    if not is_ops_user():
+        return jsonify({"error": "Only ops users can export contact messages"}), 403
+
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError:
+        return jsonify({"error": "'start' and 'end' must be ISO dates"}), 400
+
+    statement = sqlalchemy.select(
+        ContactUs.id, ContactUs.name, ContactUs.email, ContactUs.phone_number,
+        ContactUs.message, ContactUs.created_at
+    ).order_by(ContactUs.id)
+    if start:
+        statement = statement.where(ContactUs.created_at >= start)
+    if end:
+        statement = statement.where(ContactUs.created_at < end)
+
+    return export_response(statement, 'contact_us')
+
 # Add this new route to handle ambulance requests
 @app.route('/request-ambulance', methods=['POST'])
+@admission.priority(CRITICAL)
 @jwt_required()
+@idempotency.idempotent
 @validate_json(required_fields=['hospital_name', 'payment_method'])
 def request_ambulance():
     data = request.get_json()
     user_id = get_jwt_identity()
     
-    # Create a new ride history entry
-    ride_history = RideHistory(
-        user_id=user_id,
-        hospital_name=data['hospital_name'],
-        payment_method=data['payment_method']
-    )
-    
+    # Optional pickup location, used by the dispatcher to pick the nearest ambulance
     try:
-        db.session.add(ride_history)
-        db.session.commit()
+        latitude = float(data['latitude']) if data.get('latitude') is not None else None
+        longitude = float(data['longitude']) if data.get('longitude') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "'latitude' and 'longitude' must be numbers"}), 400
+
+    try:
+        # Create a new ride history entry
+        ride_history, created = save_ride_history(
+            user_id=user_id,
+            hospital_name=data['hospital_name'],
+            payment_method=data['payment_method'],
+            pickup_latitude=latitude,
+            pickup_longitude=longitude,
+            idempotency_key=g.get('idempotency_key'),
+            idempotency_fingerprint=g.get('idempotency_fingerprint')
+        )
+        if created:
+            publish_ride(ride_history)
         return jsonify(ride_history.to_dict()), 201
+    except KeyReused:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+# --------------------- AMBULANCE ROUTES ---------------------
+@app.route('/ambulances', methods=['GET'])
+@jwt_required()
+def get_ambulances():
+    query = Ambulance.query
+    if request.args.get('available') == 'true':
+        query = query.filter_by(is_available=True)
+    return jsonify([a.to_dict() for a in query.order_by(Ambulance.id).all()])
+
+def ambulance_values(data):
+    # Checked latitude / longitude / is_available from a request body; raises ValueError
+    values = {}
+    for field, bound in (('latitude', 90), ('longitude', 180)):
+        if field in data:
+            value = data[field]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not -bound <= value <= bound:
+                raise ValueError(f"'{field}' must be a number between -{bound} and {bound}")
+            values[field] = float(value)
+    if 'is_available' in data:
+        if not isinstance(data['is_available'], bool):
+            raise ValueError("'is_available' must be true or false")
+        values['is_available'] = data['is_available']
+    return values
+
+# The fleet is managed by the dispatch centre: a user marking every unit unavailable
+# would stop all dispatching
+@app.route('/ambulances', methods=['POST'])
+@jwt_required()
+@ops_required
+@validate_json(required_fields=['vehicle_no', 'latitude', 'longitude'])
+def create_ambulance():
+    data = request.get_json()
+    if not isinstance(data['vehicle_no'], str) or not data['vehicle_no'].strip():
+        return jsonify({"error": "'vehicle_no' must be a non-empty string"}), 400
+    try:
+        values = ambulance_values(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if Ambulance.query.filter_by(vehicle_no=data['vehicle_no']).first():
+        return jsonify({"error": "Vehicle already registered"}), 400
+
+    values.setdefault('is_available', True)
+    ambulance = Ambulance(vehicle_no=data['vehicle_no'], **values)
+
+    try:
+        db.session.add(ambulance)
+        db.session.commit()
+        return jsonify(ambulance.to_dict()), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+# Position / availability updates from the vehicle
+@app.route('/ambulances/<int:ambulance_id>', methods=['PATCH'])
+@admission.priority(CRITICAL)
+@jwt_required()
+@ops_required
+def update_ambulance(ambulance_id):
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    try:
+        values = ambulance_values(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    ambulance = db.session.get(Ambulance, ambulance_id)
+    if not ambulance:
+        return jsonify({"error": "Ambulance not found"}), 404
+
+    for field, value in values.items():
+        setattr(ambulance, field, value)
+
+    try:
+        db.session.commit()
+        return jsonify(ambulance.to_dict()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+# --------------------- STATS ROUTES ---------------------
+def stats_range():
+    # [start, end) widened to whole UTC hours; defaults to today in East Africa Time
+    start, end = parse_date_range(request.args)
+    if start is None:
+        start = datetime.combine((datetime.utcnow() + LOCAL_OFFSET).date(), datetime.min.time()) - LOCAL_OFFSET
+    if end is None:
+        end = start + timedelta(days=1)
+    start, end = floor_hour(start), ceil_hour(end)
+    if end <= start or end - start > MAX_STATS_RANGE:
+        raise ValueError(f"'end' must be after 'start' and at most {MAX_STATS_RANGE.days} days later")
+    return start, end
+
+def stats_response(dimension, key, label=lambda value: value):
+    try:
+        start, end = stats_range()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows = ride_rollups.totals(db.session, dimension, start, end)
+    return jsonify({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "total": sum(rides for _, rides in rows),
+        key: [{dimension: label(value), "rides": rides} for value, rides in rows]
+    })
+
+@app.route('/stats/hospitals', methods=['GET'])
+@admission.priority(LOW)
+@jwt_required()
+@ops_required
+@read_replica
+def hospital_stats():
+    return stats_response('hospital_name', 'hospitals')
+
+@app.route('/stats/payment_methods', methods=['GET'])
+@admission.priority(LOW)
+@jwt_required()
+@ops_required
+@read_replica
+def payment_method_stats():
+    return stats_response('payment_method', 'payment_methods', lambda value: value or None)
+
+@app.route('/stats/hourly', methods=['GET'])
+@admission.priority(LOW)
+@jwt_required()
+@ops_required
+@read_replica
+def hourly_stats():
+    return stats_response('hour_start', 'hours', lambda value: value.isoformat())
+
 # Update the app.run configuration
+# The built client: files from the startup manifest, index.html for client-side routes
 @app.route('/')
 def serve():
-    return send_from_directory('../client/dist', 'index.html')
+    return serve_static('index.html')
 
 @app.route('/<path:path>')
 def serve_static(path):
-    if path != "" and os.path.exists("../client/dist/" + path):
-        return send_from_directory('../client/dist', path)
-    else:
-        return send_from_directory('../client/dist', 'index.html')
+    response = static_assets.response(path)
+    if response is None:
+        return jsonify({"error": "Not found"}), 404
+    return response
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
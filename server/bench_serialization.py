@@ -0,0 +1,122 @@
+"""Ride history serialization benchmark: ORM objects + strftime + stdlib json
+against column tuples + row_to_dict + orjson.
+
+Runs against a throwaway in-memory SQLite database, so it needs no server.
+
+    python bench_serialization.py --rows 200000 --page 200
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert, or_, select
+
+from models import db, User, RideHistory, RideStatusEnum
+from serialization import OrjsonProvider
+
+
+def legacy_to_dict(ride):
+    # RideHistory.to_dict as it was before the projection path
+    local_date = ride.date + timedelta(hours=3) if ride.date else None
+    return {
+        "id": ride.id,
+        "user_id": ride.user_id,
+        "hospital_name": ride.hospital_name,
+        "payment_method": ride.payment_method,
+        "status": ride.status.name if ride.status else None,
+        "ambulance_id": ride.ambulance_id,
+        "pickup_latitude": ride.pickup_latitude,
+        "pickup_longitude": ride.pickup_longitude,
+        "date": ride.date.isoformat() if ride.date else None,
+        "formatted_date": local_date.strftime("%b %d, %Y %I:%M %p") if local_date else None
+    }
+
+
+def seed(rows, seed):
+    rng = random.Random(seed)
+    user = User(name="Bench", email="bench@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    start = datetime(2024, 1, 1)
+    statuses = list(RideStatusEnum)
+    batch = []
+    for i in range(rows):
+        batch.append({"user_id": user.id, "hospital_name": f"Hospital {rng.randrange(500)}",
+                      "payment_method": rng.choice(["Cash", "M-Pesa", "Insurance"]),
+                      "status": rng.choice(statuses), "date": start + timedelta(minutes=i),
+                      "pickup_latitude": -1.29 + rng.uniform(-0.2, 0.2),
+                      "pickup_longitude": 36.82 + rng.uniform(-0.2, 0.2)})
+        if len(batch) == 10000:
+            db.session.execute(insert(RideHistory), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(RideHistory), batch)
+    db.session.commit()
+    return user.id
+
+
+def run(label, render, rows, page, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        cursor = None
+        while True:
+            cursor = render(cursor)
+            if cursor is None:
+                break
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<34} {rows / best:>12,.0f} rows/s  ({best * 1000:.0f} ms for {rows} rows)")
+    return rows / best
+
+
+def main(rows, page, repeat, seed_value):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    stock, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        user_id = seed(rows, seed_value)
+        order = (RideHistory.date.desc(), RideHistory.id.desc())
+
+        def page_after(statement, cursor):
+            # Keyset pagination on (date, id), the same walk GET /ride_history does
+            if cursor:
+                statement = statement.where(RideHistory.date <= cursor[0],
+                                            or_(RideHistory.date < cursor[0], RideHistory.id < cursor[1]))
+            return statement.where(RideHistory.user_id == user_id).order_by(*order).limit(page)
+
+        def before(cursor):
+            history = db.session.execute(page_after(select(RideHistory), cursor)).scalars().all()
+            stock.response([legacy_to_dict(h) for h in history]).get_data()
+            return (history[-1].date, history[-1].id) if len(history) == page else None
+
+        def after(cursor):
+            history = db.session.execute(page_after(select(*RideHistory.dict_columns()), cursor)).all()
+            fast.response([RideHistory.row_to_dict(h) for h in history]).get_data()
+            return (history[-1].date, history[-1].id) if len(history) == page else None
+
+        first = db.session.execute(page_after(select(RideHistory), None)).scalars().all()
+        rows_first = db.session.execute(page_after(select(*RideHistory.dict_columns()), None)).all()
+        assert (stock.response([legacy_to_dict(h) for h in first]).get_data()
+                == fast.response([RideHistory.row_to_dict(h) for h in rows_first]).get_data()), \
+            "both paths must produce identical bytes"
+        print(f"{rows} rides, pages of {page}, best of {repeat}")
+        slow = run("ORM + strftime + json", before, rows, page, repeat)
+        quick = run("columns + row_to_dict + orjson", after, rows, page, repeat)
+        print(f"speedup {quick / slow:.2f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--page", type=int, default=200, help="rows per response, as in GET /ride_history")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.rows, args.page, args.repeat, args.seed)
@@ -0,0 +1,143 @@
+"""Concurrent-connection capacity of the gunicorn worker profiles.
+
+For each worker class a fresh database is seeded and gunicorn is started on
+it, as with ``loadtest.py --start-server``. The benchmark opens ``--streams``
+ride status streams (long-lived Server-Sent Events connections, one per open
+ride screen) and holds them while ``--clients`` concurrent clients request
+GET /ride_history for ``--duration`` seconds. It reports how many streams
+the server accepted and the throughput and latency of the ordinary requests
+next to them. Every open stream pins a sync worker, so sync workers stop
+answering once the streams outnumber them; gevent workers keep serving.
+
+    python bench_workers.py --worker-classes sync,gthread,gevent --streams 200 --clients 16
+"""
+import argparse
+import importlib.util
+import json
+import os
+import selectors
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from loadtest import Client, Recorder, _safe, start_server
+from simulate import percentile
+
+# Worker classes that need a package gunicorn does not ship with
+REQUIRES = {"gevent": "gevent"}
+
+
+def open_streams(base_url, tokens, count, timeout):
+    # Open `count` SSE connections and wait up to `timeout` seconds for their first
+    # bytes. Returns (sockets, accepted); unanswered sockets stay open in the backlog.
+    parts = urlsplit(base_url)
+    selector = selectors.DefaultSelector()
+    sockets = []
+    for i in range(count):
+        try:
+            sock = socket.create_connection((parts.hostname, parts.port), timeout=timeout)
+        except OSError:
+            break
+        request = (f"GET /ride_history/stream?jwt={tokens[i % len(tokens)]} HTTP/1.1\r\n"
+                   f"Host: {parts.netloc}\r\nAccept: text/event-stream\r\n\r\n")
+        sock.sendall(request.encode())
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+        sockets.append(sock)
+
+    accepted = 0
+    deadline = time.monotonic() + timeout
+    while accepted < len(sockets) and time.monotonic() < deadline:
+        for key, _ in selector.select(timeout=max(0.0, deadline - time.monotonic())):
+            data = _safe(lambda: key.fileobj.recv(4096))
+            selector.unregister(key.fileobj)
+            if data and data.startswith(b"HTTP/1.1 200"):
+                accepted += 1
+    selector.close()
+    return sockets, accepted
+
+
+def probe_loop(base_url, token, deadline, recorder, timeout):
+    client = Client(base_url, timeout=timeout)
+    client.token = token
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        recorder.record("GET /ride_history", started,
+                        _safe(lambda: client.request("GET", "/ride_history?limit=50")[0]))
+
+
+def run(args, worker_class):
+    args.worker_class = worker_class
+    base_url, process = start_server(args)
+    sockets = []
+    try:
+        tokens = []
+        for i in range(min(args.users, args.clients)):
+            client = Client(base_url)
+            if client.login(f"loadtest{i}@example.com") == 200:
+                tokens.append(client.token)
+        if not tokens:
+            raise SystemExit("could not log in as any synthetic user")
+
+        sockets, accepted = open_streams(base_url, tokens, args.streams, args.stream_timeout)
+        recorder = Recorder()
+        deadline = time.monotonic() + args.duration
+        threads = [threading.Thread(target=probe_loop, daemon=True, args=(
+            base_url, tokens[i % len(tokens)], deadline, recorder, args.request_timeout
+        )) for i in range(args.clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        for sock in sockets:
+            sock.close()
+        process.terminate()
+        process.wait()
+
+    latencies = recorder.latencies.get("GET /ride_history", [])
+    return {"streams": accepted, "requests": len(latencies),
+            "errors": recorder.errors.get("GET /ride_history", 0), "rps": len(latencies) / elapsed,
+            "p50": percentile(latencies, 50), "p95": percentile(latencies, 95)}
+
+
+def main(args):
+    # Measure the streams on every profile, including those that turn them off by default
+    os.environ["RIDE_STREAM_ENABLED"] = "true"
+    results = {}
+    for worker_class in args.worker_classes.split(","):
+        package = REQUIRES.get(worker_class)
+        if package and importlib.util.find_spec(package) is None:
+            print(f"Skipping {worker_class}: {package} is not installed")
+            continue
+        results[worker_class] = run(args, worker_class)
+
+    print(f"{args.streams} streams held open, {args.clients} clients for {args.duration:.0f} s "
+          f"({args.workers or 'default'} workers)")
+    print(f"{'workers':<10}{'streams':>9}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for worker_class, r in results.items():
+        print(f"{worker_class:<10}{r['streams']:>9}{r['requests']:>10}{r['errors']:>8}{r['rps']:>9.1f}"
+              f"{r['p50']:>9.1f}{r['p95']:>9.1f}")
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--worker-classes", default="sync,gevent", help="comma-separated gunicorn worker classes")
+    parser.add_argument("--workers", type=int, help="gunicorn workers (default: gunicorn.conf.py)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=50, help="synthetic users seeded")
+    parser.add_argument("--rides-per-user", type=int, default=20)
+    parser.add_argument("--streams", type=int, default=200, help="ride status streams held open")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent GET /ride_history clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--stream-timeout", type=float, default=5, help="seconds to wait for streams to open")
+    parser.add_argument("--request-timeout", type=float, default=5, help="seconds before a request counts as failed")
+    parser.add_argument("--save", help="write the results as JSON")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,77 @@
+import os
+from functools import wraps
+
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+
+def database_url(url):
+    # Hosting providers still hand out the deprecated postgres:// scheme
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def engine_options(url):
+    """SQLAlchemy engine/pool settings for ``url``, tunable through the environment."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"connect_args": {"timeout": float(os.environ.get("SQLITE_BUSY_TIMEOUT", 5))}}
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": True,
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers keep going while a writer commits; NORMAL sync is durable in WAL mode
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')}")
+    cursor.execute(f"PRAGMA busy_timeout={int(float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5)) * 1000)}")
+    cursor.execute(f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}")
+    cursor.execute(f"PRAGMA cache_size={int(os.environ.get('SQLITE_CACHE_SIZE', -64000))}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def tune_engine(engine):
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    return engine
+
+
+def init_replica(app):
+    url = app.config.get("SQLALCHEMY_REPLICA_URI")
+    if url:
+        app.extensions["db_replica"] = tune_engine(create_engine(url, **engine_options(url)))
+
+
+class RoutingSession(Session):
+    # Sends reads to the replica engine inside @read_replica views; anything
+    # that flushes or runs outside such a view stays on the primary, as does
+    # everything while g.use_primary is set (results that must not lag writes).
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context() and g.get("use_replica")
+                and not g.get("use_primary")):
+            replica = current_app.extensions.get("db_replica")
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(f):
+    """Serve the decorated read-only view from the replica, if one is configured."""
+    @wraps(f)
+    def wrapped(*args, **kwargs):
+        g.use_replica = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.use_replica = False
+    return wrapped
@@ -0,0 +1,134 @@
+import heapq
+import logging
+import time
+
+import numpy as np
+from sqlalchemy import update
+
+from models import db, RideHistory, Ambulance, RideStatusEnum
+from ranking import great_circle_km, MAX_MATRIX_CELLS
+
+logger = logging.getLogger(__name__)
+
+
+def assign(requests, units, candidates=8):
+    """Greedy batch assignment of requests to units by pickup distance.
+
+    ``requests`` and ``units`` are sequences of ``(id, lat, lng)``. Each request
+    only considers its ``candidates`` nearest units; the globally shortest
+    (request, unit) pairs are taken first from a heap, and requests whose
+    candidates all went to someone else are retried against what is left.
+    Returns a list of ``(request_id, unit_id, distance_km)``.
+    """
+    requests = list(requests)
+    units = list(units)
+    assignments = []
+
+    while requests and units:
+        request_pos = np.array([(lat, lng) for _, lat, lng in requests], dtype=float)
+        unit_pos = np.array([(lat, lng) for _, lat, lng in units], dtype=float)
+        k = min(candidates, len(units))
+        chunk = max(1, MAX_MATRIX_CELLS // len(units))
+
+        heap = []
+        for start in range(0, len(requests), chunk):
+            distances = great_circle_km(request_pos[start:start + chunk, 0], request_pos[start:start + chunk, 1],
+                                        unit_pos[:, 0], unit_pos[:, 1])
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            for row, unit_indexes in enumerate(nearest):
+                for unit_index in unit_indexes:
+                    # Row order is the priority order, so equal distances favour the older request
+                    heap.append((float(distances[row, unit_index]), start + row, int(unit_index)))
+        heapq.heapify(heap)
+
+        matched_requests = set()
+        matched_units = set()
+        while heap:
+            distance, request_index, unit_index = heapq.heappop(heap)
+            if request_index in matched_requests or unit_index in matched_units:
+                continue
+            matched_requests.add(request_index)
+            matched_units.add(unit_index)
+            assignments.append((requests[request_index][0], units[unit_index][0], distance))
+
+        if not matched_requests:
+            break
+        requests = [r for i, r in enumerate(requests) if i not in matched_requests]
+        units = [u for i, u in enumerate(units) if i not in matched_units]
+
+    return assignments
+
+
+class Dispatcher:
+    # Matches the oldest pending rides to the nearest available ambulances.
+    # Claims are conditional updates, so two dispatchers can never hand out
+    # the same ambulance or dispatch the same ride twice.
+
+    def __init__(self, on_dispatch=None, batch_size=200, candidates=8):
+        self.on_dispatch = on_dispatch
+        self.batch_size = batch_size
+        self.candidates = candidates
+
+    def run_once(self):
+        pending = (RideHistory.query
+                   .filter(RideHistory.status == RideStatusEnum.PENDING,
+                           RideHistory.ambulance_id.is_(None),
+                           RideHistory.pickup_latitude.isnot(None),
+                           RideHistory.pickup_longitude.isnot(None))
+                   .order_by(RideHistory.date, RideHistory.id)
+                   .limit(self.batch_size)
+                   .all())
+        if not pending:
+            return []
+        units = Ambulance.query.filter_by(is_available=True).all()
+
+        pairs = assign(
+            [(r.id, r.pickup_latitude, r.pickup_longitude) for r in pending],
+            [(u.id, u.latitude, u.longitude) for u in units],
+            candidates=self.candidates
+        )
+
+        dispatched = []
+        for ride_id, unit_id, _ in pairs:
+            claimed = db.session.execute(
+                update(Ambulance)
+                .where(Ambulance.id == unit_id, Ambulance.is_available.is_(True))
+                .values(is_available=False)
+            ).rowcount
+            if not claimed:
+                continue
+            taken = db.session.execute(
+                update(RideHistory)
+                .where(RideHistory.id == ride_id,
+                       RideHistory.status == RideStatusEnum.PENDING,
+                       RideHistory.ambulance_id.is_(None))
+                .values(ambulance_id=unit_id, status=RideStatusEnum.DISPATCHED)
+            ).rowcount
+            if not taken:
+                db.session.execute(update(Ambulance).where(Ambulance.id == unit_id).values(is_available=True))
+                continue
+            dispatched.append(ride_id)
+        db.session.commit()
+
+        if dispatched and self.on_dispatch:
+            for ride in RideHistory.query.filter(RideHistory.id.in_(dispatched)):
+                self.on_dispatch(ride)
+        return dispatched
+
+    def run_forever(self, interval=1.0):
+        while True:
+            started = time.monotonic()
+            dispatched = []
+            try:
+                dispatched = self.run_once()
+                if dispatched:
+                    logger.info("Dispatched %d rides in %.1f ms", len(dispatched),
+                                (time.monotonic() - started) * 1000)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Dispatch cycle failed")
+            finally:
+                db.session.remove()
+            # Go straight into the next cycle while a storm keeps the batch full
+            if len(dispatched) < self.batch_size:
+                time.sleep(interval)
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Rows fetched per round trip from the server-side cursor, and rows per streamed chunk
+YIELD_PER = 1000
+CHUNK_ROWS = 500
+
+
+def _jsonable(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def stream_ndjson(fields, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({field: _jsonable(value) for field, value in zip(fields, row)}))
+        if len(lines) >= CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def stream_csv(fields, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    pending = 0
+    for row in rows:
+        writer.writerow([_jsonable(value) for value in row])
+        pending += 1
+        if pending >= CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def stream_rows(session, statement, export_format):
+    """Run ``statement`` with a server-side cursor and encode its rows as they arrive."""
+    result = session.execute(statement.execution_options(yield_per=YIELD_PER))
+    fields = list(result.keys())
+    encoder = stream_csv if export_format == "csv" else stream_ndjson
+    return encoder(fields, result)
+
+
+def parse_date_range(args):
+    # ISO dates or datetimes; 'end' is exclusive. Raises ValueError on bad input.
+    start = args.get('start')
+    end = args.get('end')
+    return (datetime.fromisoformat(start) if start else None,
+            datetime.fromisoformat(end) if end else None)
@@ -0,0 +1,106 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy import insert
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """Batches single-row inserts from concurrent requests into one transaction.
+
+    The writer thread takes the first pending insert, keeps collecting for up to
+    ``window`` seconds (or ``max_batch`` rows), then writes them all with one
+    executemany + RETURNING and a single commit. Each caller gets back its own
+    row as a dict, including the generated id and column defaults.
+
+    Batching needs concurrent requests in the same process, i.e. threaded or
+    gevent workers. Callers wait for the outcome of their insert however
+    long the write takes: giving up early could report a failure for a row
+    that still commits, and the client's retry would then duplicate it.
+    """
+
+    def __init__(self, engine, window=0.005, max_batch=200):
+        self.engine = engine
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        # Started lazily, and again after a fork, since threads do not survive into gunicorn workers
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, name="group-commit", daemon=True).start()
+                self._pid = os.getpid()
+
+    def submit(self, table, values):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((table, values, future))
+        return future.result()
+
+    def _run(self):
+        pending = self._queue
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                # Never leave a caller waiting on a batch the writer gave up on
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _write(self, batch):
+        # executemany needs the same columns in every row, so group by table and column set
+        groups = {}
+        for table, values, future in batch:
+            groups.setdefault((table, frozenset(values)), []).append((values, future))
+
+        try:
+            with self.engine.begin() as conn:
+                results = [(items, self._insert(conn, table, [values for values, _ in items]))
+                           for (table, _), items in groups.items()]
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            logger.warning("Group commit of %d rows failed, retrying rows one by one", len(batch), exc_info=True)
+            self._write_individually(batch)
+            return
+
+        for items, rows in results:
+            for (_, future), row in zip(items, rows):
+                future.set_result(row)
+
+    def _write_individually(self, batch):
+        # Isolate the offending row(s) so one bad insert does not fail the whole batch
+        for table, values, future in batch:
+            try:
+                with self.engine.begin() as conn:
+                    future.set_result(self._insert(conn, table, [values])[0])
+            except Exception as e:
+                future.set_exception(e)
+
+    @staticmethod
+    def _insert(conn, table, rows):
+        statement = insert(table).returning(*table.c, sort_by_parameter_order=True)
+        return [dict(row._mapping) for row in conn.execute(statement, rows)]
@@ -1,2 +1,52 @@
-workers = 4
-bind = "0.0.0.0:8000"
\ No newline at end of file
+import os
+import shutil
+
+# Worker profile, picked with GUNICORN_WORKER_CLASS:
+#   sync     one request at a time per worker. A slow client or an open
+#            /ride_history/stream pins the whole worker.
+#   gthread  GUNICORN_THREADS requests per worker on OS threads, no extra dependency.
+#   gevent   up to GUNICORN_WORKER_CONNECTIONS requests per worker on greenlets, for
+#            thousands of idle streams and slow clients. Needs gevent (and psycogreen
+#            on Postgres).
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+# The app reads it back to turn off what sync workers cannot use
+os.environ["GUNICORN_WORKER_CLASS"] = worker_class
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+bind = "0.0.0.0:8000"
+
+if worker_class == "gthread":
+    threads = int(os.environ.get("GUNICORN_THREADS", 8))
+elif worker_class == "gevent":
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000))
+
+    def post_fork(server, worker):
+        # psycopg2 waits for Postgres inside C and would stall every greenlet in the
+        # worker; the wait callback makes it yield to the event loop instead
+        if not os.environ.get("DATABASE_URL", "").startswith("postgres"):
+            return
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning("psycogreen is not installed: Postgres queries will block gevent workers")
+        else:
+            patch_psycopg()
+
+# Each open ride status stream holds a sync worker or a gthread thread for as long as the page
+# is open, so a few tabs would starve everyone else. Only gevent offers streams by default;
+# elsewhere the client polls GET /ride_history instead.
+os.environ.setdefault("RIDE_STREAM_ENABLED", "true" if worker_class == "gevent" else "false")
+
+# With METRICS_ENABLED every worker writes its samples to a shared directory
+# that /metrics aggregates. It must be set before any worker imports the app.
+if os.environ.get("METRICS_ENABLED", "false").lower() == "true":
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/ambulance-metrics")
+
+    def on_starting(server):
+        # Samples from a previous run would otherwise be summed into this one
+        path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+    def child_exit(server, worker):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,112 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, g, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+MAX_KEY_LENGTH = 100
+REUSED_KEY_ERROR = "Idempotency-Key was already used for a different request"
+
+
+class KeyReused(Exception):
+    """Raised by a view that found its key already stored with a different request's fingerprint."""
+
+
+def request_fingerprint():
+    # Hex so it can be stored beside the key; the path is included because one key scope
+    # covers every idempotent route
+    return hashlib.sha256(f"{request.method} {request.path}\n".encode() + request.get_data()).hexdigest()
+
+
+class _Entry:
+    def __init__(self, fingerprint, expires):
+        self.fingerprint = fingerprint
+        self.expires = expires
+        self.response = None  # (status, body, content type) once the first request finished
+        self.done = threading.Event()
+
+
+class IdempotencyStore:
+    """Responses to recent ``Idempotency-Key`` requests, bounded in size and age.
+
+    The first request with a key runs the view. A retry after it finished
+    gets the stored response back, and a retry that arrives while it is still
+    running waits for it. Only successful responses are kept; a failure frees
+    the key so the client can try again. This covers one worker, and callers
+    back it with a unique constraint for retries that land on another.
+    """
+
+    def __init__(self, max_entries=10000, ttl=24 * 3600, wait_timeout=10):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def idempotent(self, f):
+        """Honour an ``Idempotency-Key`` header on a ``@jwt_required`` view. The key and
+        the request's fingerprint are available to the view as ``g.idempotency_key`` and
+        ``g.idempotency_fingerprint``; a view that raises ``KeyReused`` answers 422."""
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            key = request.headers.get("Idempotency-Key")
+            if key is None:
+                return f(*args, **kwargs)
+            if not 0 < len(key) <= MAX_KEY_LENGTH:
+                return jsonify({"error": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"}), 400
+
+            scope = (str(get_jwt_identity()), key)
+            fingerprint = request_fingerprint()
+            entry, owner = self._claim(scope, fingerprint)
+            if entry is None:
+                return jsonify({"error": REUSED_KEY_ERROR}), 422
+            if not owner:
+                if not entry.done.wait(self.wait_timeout) or entry.response is None:
+                    error = "The original request with this Idempotency-Key has not completed"
+                    return jsonify({"error": error}), 409, {"Retry-After": "1"}
+                status, body, content_type = entry.response
+                return Response(body, status=status, content_type=content_type,
+                                headers={"Idempotent-Replayed": "true"})
+
+            g.idempotency_key = key
+            g.idempotency_fingerprint = fingerprint
+            try:
+                response = make_response(f(*args, **kwargs))
+            except KeyReused:
+                self._release(scope, entry)
+                return jsonify({"error": REUSED_KEY_ERROR}), 422
+            except BaseException:
+                self._release(scope, entry)
+                raise
+            if 200 <= response.status_code < 300 and not response.is_streamed:
+                entry.response = (response.status_code, response.get_data(), response.content_type)
+                entry.done.set()
+            else:
+                self._release(scope, entry)
+            return response
+        return wrapped
+
+    def _claim(self, scope, fingerprint):
+        # (entry, True) for the first request with this key, (entry, False) for a repeat,
+        # (None, False) when the key was used with a different body
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry is not None and entry.expires <= now:
+                del self._entries[scope]
+                entry = None
+            if entry is not None:
+                return (entry, False) if entry.fingerprint == fingerprint else (None, False)
+            entry = self._entries[scope] = _Entry(fingerprint, now + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry, True
+
+    def _release(self, scope, entry):
+        with self._lock:
+            if self._entries.get(scope) is entry:
+                del self._entries[scope]
+        entry.done.set()
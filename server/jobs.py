@@ -0,0 +1,120 @@
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, update
+
+logger = logging.getLogger(__name__)
+
+QUEUED, FAILED = "queued", "failed"
+
+
+class JobQueue:
+    """Durable background jobs in a database table, without an external broker.
+
+    ``enqueue`` adds a row on the caller's session, so a job is only queued
+    if the request's transaction commits. Workers (``flask jobs-worker``)
+    claim a due job by pushing its ``run_at`` forward by ``visibility_timeout``
+    and bumping ``attempts``. A worker that dies mid-job therefore lets the
+    job reappear once the timeout passes. The handler runs in the same
+    transaction that deletes the job, so its writes and the job's
+    completion commit together. The deletion is fenced on the attempt
+    number, and a worker that overran its lease rolls back instead of
+    finishing a job that was handed to someone else. Failures are retried
+    with exponential backoff until ``max_attempts``, then kept as ``failed``.
+    """
+
+    def __init__(self, table, engine=None, visibility_timeout=60, max_attempts=5, backoff=2.0, max_backoff=600):
+        self.table = table
+        self.engine = engine
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.handlers = {}
+
+    def task(self, name):
+        """Register ``f(conn, payload)`` as the handler for jobs called ``name``."""
+        def decorator(f):
+            self.handlers[name] = f
+            return f
+        return decorator
+
+    def enqueue(self, session, name, payload, delay=0):
+        # Returns the job id; the caller commits
+        if name not in self.handlers:
+            raise ValueError(f"No handler registered for job {name!r}")
+        now = datetime.utcnow()
+        return session.execute(insert(self.table).values(
+            task=name, payload=json.dumps(payload), status=QUEUED, attempts=0, max_attempts=self.max_attempts,
+            run_at=now + timedelta(seconds=delay), created_at=now
+        )).inserted_primary_key[0]
+
+    def claim(self):
+        # The next due job as a row (id, task, payload, attempts, max_attempts), or None
+        table = self.table
+        now = datetime.utcnow()
+        due = (select(table.c.id).where(table.c.status == QUEUED, table.c.run_at <= now)
+               .order_by(table.c.run_at, table.c.id).limit(1))
+        if self.engine.dialect.name == "postgresql":
+            due = due.with_for_update(skip_locked=True)
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(table).where(table.c.id == due.scalar_subquery())
+                .values(run_at=now + timedelta(seconds=self.visibility_timeout), attempts=table.c.attempts + 1)
+                .returning(table.c.id, table.c.task, table.c.payload, table.c.attempts, table.c.max_attempts)
+            ).first()
+
+    def run_once(self):
+        # Runs one due job; returns False when there was none
+        job = self.claim()
+        if job is None:
+            return False
+        table = self.table
+        try:
+            handler = self.handlers.get(job.task)
+            if handler is None:
+                raise LookupError(f"No handler registered for job {job.task!r}")
+            with self.engine.begin() as conn:
+                handler(conn, json.loads(job.payload))
+                finished = conn.execute(
+                    delete(table).where(table.c.id == job.id, table.c.attempts == job.attempts)
+                ).rowcount
+                if not finished:
+                    raise _LeaseLost()
+        except _LeaseLost:
+            logger.warning("Job %d (%s) outlived its visibility timeout; its work was rolled back", job.id, job.task)
+        except Exception as error:
+            self._failed(job, error)
+        return True
+
+    def _failed(self, job, error):
+        table = self.table
+        values = {"last_error": f"{type(error).__name__}: {error}"[:1000]}
+        if job.attempts >= job.max_attempts:
+            values["status"] = FAILED
+            logger.error("Job %d (%s) failed for good after %d attempts", job.id, job.task, job.attempts,
+                         exc_info=error)
+        else:
+            # Exponential backoff with jitter, so a burst of failures does not retry in lockstep
+            delay = min(self.backoff * 2 ** (job.attempts - 1), self.max_backoff) * random.uniform(0.5, 1.0)
+            values["run_at"] = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning("Job %d (%s) failed, retrying in %.1f s", job.id, job.task, delay, exc_info=error)
+        with self.engine.begin() as conn:
+            conn.execute(update(table).where(table.c.id == job.id, table.c.attempts == job.attempts).values(**values))
+
+    def run_forever(self, interval=1.0):
+        while True:
+            try:
+                # Drain everything that is due before sleeping
+                if self.run_once():
+                    continue
+            except Exception:
+                logger.exception("Claiming a job failed")
+            time.sleep(interval)
+
+
+class _LeaseLost(Exception):
+    pass
@@ -0,0 +1,225 @@
+"""HTTP load test for the Flask API.
+
+Concurrent clients log in as the synthetic users from ``seed.py --users`` and
+then hammer a weighted mix of /login, /request-ambulance, GET /ride_history
+and GET /favorites. Throughput and p50/p95/p99 latency are reported per
+endpoint. With ``--start-server`` a fresh SQLite database is seeded and a
+local gunicorn (gunicorn.conf.py) is started against it.
+
+    python loadtest.py --start-server --users 200 --clients 32 --duration 30 --save run.json
+    python loadtest.py --url http://127.0.0.1:8000 --compare run.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from simulate import percentile
+
+# Relative share of each operation in the steady-state mix
+MIX = [
+    ("GET /ride_history", 40),
+    ("GET /favorites", 30),
+    ("POST /request-ambulance", 20),
+    ("POST /login", 10),
+]
+HOSPITALS = ["City Hospital", "Greenwood Hospital", "Kenyatta National Hospital", "Nairobi Hospital"]
+
+
+class Client:
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self.token = None
+
+    def request(self, method, path, body=None):
+        # gunicorn's sync workers close every connection, so there is no keep-alive to reuse
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+        finally:
+            conn.close()
+
+    def login(self, email):
+        status, body = self.request("POST", "/login", {"email": email, "password": "password123"})
+        if status == 200:
+            self.token = json.loads(body)["access_token"]
+        return status
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, started, status):
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.latencies.setdefault(name, []).append(elapsed)
+            if status >= 400 or status == 0:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def client_loop(base_url, email, deadline, recorder, rng):
+    client = Client(base_url)
+    names, weights = zip(*MIX)
+    started = time.perf_counter()
+    recorder.record("POST /login", started, _safe(lambda: client.login(email)))
+
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        if name == "GET /ride_history":
+            status = _safe(lambda: client.request("GET", "/ride_history?limit=50")[0])
+        elif name == "GET /favorites":
+            status = _safe(lambda: client.request("GET", "/favorites")[0])
+        elif name == "POST /request-ambulance":
+            status = _safe(lambda: client.request("POST", "/request-ambulance", {
+                "hospital_name": rng.choice(HOSPITALS), "payment_method": "Cash",
+                "latitude": -1.29 + rng.uniform(-0.1, 0.1), "longitude": 36.82 + rng.uniform(-0.1, 0.1)
+            })[0])
+        else:
+            status = _safe(lambda: client.login(email))
+        recorder.record(name, started, status)
+
+
+def _safe(call):
+    try:
+        return call()
+    except (OSError, http.client.HTTPException):
+        return 0
+
+
+def summarize(recorder, elapsed):
+    results = {}
+    for name in sorted(recorder.latencies):
+        values = recorder.latencies[name]
+        results[name] = {"requests": len(values), "errors": recorder.errors.get(name, 0),
+                         "rps": len(values) / elapsed, "p50": percentile(values, 50),
+                         "p95": percentile(values, 95), "p99": percentile(values, 99)}
+    everything = [v for values in recorder.latencies.values() for v in values]
+    results["total"] = {"requests": len(everything), "errors": sum(recorder.errors.values()),
+                        "rps": len(everything) / elapsed, "p50": percentile(everything, 50),
+                        "p95": percentile(everything, 95), "p99": percentile(everything, 99)}
+    return results
+
+
+def print_results(results):
+    print(f"{'endpoint':<26}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['requests']:>10}{r['errors']:>8}{r['rps']:>9.1f}"
+              f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}")
+
+
+def compare(results, baseline, tolerance):
+    # A regression is less throughput or a slower p95 than the baseline by more than tolerance
+    regressions = []
+    for name, old in baseline.items():
+        new = results.get(name)
+        if not new:
+            continue
+        if new["rps"] < old["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {old['rps']:.1f} -> {new['rps']:.1f} req/s")
+        if new["p95"] > old["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {old['p95']:.1f} -> {new['p95']:.1f} ms")
+    return regressions
+
+
+def start_server(args):
+    # Fresh database, seeded, then gunicorn on it; returns (base_url, process)
+    workdir = tempfile.mkdtemp(prefix="ambulance-loadtest-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'loadtest.db')}")
+    if args.worker_class:
+        env["GUNICORN_WORKER_CLASS"] = args.worker_class
+    here = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, "seed.py", "--users", str(args.users),
+                    "--rides-per-user", str(args.rides_per_user)], cwd=here, env=env, check=True)
+    bind = f"127.0.0.1:{args.port}"
+    command = ["gunicorn", "-c", "gunicorn.conf.py", "--bind", bind]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    process = subprocess.Popen(command + ["app:app"], cwd=here, env=env)
+
+    base_url = f"http://{bind}"
+    client = Client(base_url, timeout=2)
+    for _ in range(100):
+        if process.poll() is not None:
+            raise SystemExit("gunicorn exited during startup")
+        if _safe(lambda: client.request("GET", "/favorites")[0]):
+            return base_url, process
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("gunicorn did not come up")
+
+
+def main(args):
+    process = None
+    base_url = args.url
+    if args.start_server:
+        base_url, process = start_server(args)
+    try:
+        recorder = Recorder()
+        deadline = time.monotonic() + args.duration
+        rng = random.Random(args.seed)
+        threads = [threading.Thread(target=client_loop, daemon=True, args=(
+            base_url, f"loadtest{i % args.users}@example.com", deadline, recorder, random.Random(rng.random())
+        )) for i in range(args.clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if process:
+            process.send_signal(signal.SIGTERM)
+            process.wait()
+
+    results = summarize(recorder, elapsed)
+    print(f"{args.clients} clients for {elapsed:.1f} s against {base_url}")
+    print_results(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server to test (ignored with --start-server)")
+    parser.add_argument("--start-server", action="store_true", help="seed a fresh database and run gunicorn on it")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, help="gunicorn workers (default: gunicorn.conf.py)")
+    parser.add_argument("--worker-class", choices=["sync", "gthread", "gevent"],
+                        help="gunicorn worker profile (default: gunicorn.conf.py)")
+    parser.add_argument("--users", type=int, default=100, help="synthetic users seeded / logged in as")
+    parser.add_argument("--rides-per-user", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="write the results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from --save; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing --compare")
+    args = parser.parse_args()
+    main(args)
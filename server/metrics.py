@@ -0,0 +1,115 @@
+import logging
+import os
+import time
+
+from flask import Response, g, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Database calls are far shorter than requests, so they get finer buckets
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Metrics:
+    """Request and SQL timing exported in the Prometheus text format.
+
+    Nothing is hooked into Flask or SQLAlchemy until ``init_app`` is called,
+    so a disabled deployment pays nothing. Under gunicorn, set
+    ``PROMETHEUS_MULTIPROC_DIR`` (gunicorn.conf.py does) and every worker
+    writes its samples there for ``/metrics`` to aggregate.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_query_seconds = None
+
+    def init_app(self, app, engines, slow_query_ms=250):
+        # prometheus_client picks its storage from PROMETHEUS_MULTIPROC_DIR on import
+        from prometheus_client import Counter, Gauge, Histogram
+
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "Time spent handling a request", ["method", "route"])
+        self.requests = Counter(
+            "http_requests_total", "Requests handled", ["method", "route", "status"])
+        self.in_progress = Gauge(
+            "http_requests_in_progress", "Requests being handled", multiprocess_mode="livesum")
+        self.errors = Counter(
+            "http_unhandled_exceptions_total", "Exceptions that reached the general error handler", ["type"])
+        self.query_duration = Histogram(
+            "db_query_duration_seconds", "Time spent executing SQL", ["statement"], buckets=DB_BUCKETS)
+        self.slow_queries = Counter(
+            "db_slow_queries_total", "SQL statements slower than the slow query threshold", ["statement"])
+
+        # Ahead of hooks registered earlier (admission control), so requests they shed are timed and counted too
+        app.before_request_funcs.setdefault(None, []).insert(0, self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        self.enabled = True
+
+    def record_exception(self, error):
+        if self.enabled:
+            self.errors.labels(type(error).__name__).inc()
+
+    def exposition(self):
+        from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, REGISTRY, generate_latest
+
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+    # ---------------- request timing ----------------
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.db_seconds = 0.0
+        self.in_progress.inc()
+
+    def _after_request(self, response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            # The URL rule rather than the path, so /ride_history/1 and /ride_history/2 share a series
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            self.request_duration.labels(request.method, route).observe(elapsed)
+            self.requests.labels(request.method, route, str(response.status_code)).inc()
+            response.headers["Server-Timing"] = (f"app;dur={elapsed * 1000:.1f}, "
+                                                 f"db;dur={g.get('db_seconds', 0.0) * 1000:.1f}")
+            self.in_progress.dec()
+        return response
+
+    def _teardown_request(self, error):
+        # after_request never ran (the response could not be built); keep the gauge honest
+        if g.pop("metrics_started", None) is not None:
+            self.in_progress.dec()
+
+    # ---------------- SQL timing ----------------
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # On the execution context rather than the connection: a failed statement never reaches
+        # after_cursor_execute, and its start time must not be left behind for the next one
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement else "UNKNOWN"
+        self.query_duration.labels(kind).observe(elapsed)
+        if g:
+            g.db_seconds = g.get("db_seconds", 0.0) + elapsed
+        if elapsed >= self.slow_query_seconds:
+            self.slow_queries.labels(kind).inc()
+            logger.warning("Slow query (%.1f ms%s): %s", elapsed * 1000,
+                           f", {request.method} {request.path}" if request else "", " ".join(statement.split()))
+
+
+metrics = Metrics()
@@ -0,0 +1,45 @@
+"""add ride status and pubsub events
+
+Revision ID: 3f8a0b7d5c21
+Revises: e2f6a9c3d817
+Create Date: 2026-10-18 13:24:51.662047
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8a0b7d5c21'
+down_revision = 'e2f6a9c3d817'
+branch_labels = None
+depends_on = None
+
+ride_status = sa.Enum('PENDING', 'GEARING_UP', 'DISPATCHED', 'EN_ROUTE', 'ARRIVED', 'COMPLETED', 'CANCELLED',
+                      name='ridestatusenum')
+
+
+def upgrade():
+    ride_status.create(op.get_bind(), checkfirst=True)
+    with op.batch_alter_table('ride_history', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', ride_status, nullable=False, server_default='PENDING'))
+
+    op.create_table('pubsub_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('channel', sa.String(length=100), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('pubsub_events', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pubsub_events_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pubsub_events', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pubsub_events_created_at'))
+    op.drop_table('pubsub_events')
+
+    with op.batch_alter_table('ride_history', schema=None) as batch_op:
+        batch_op.drop_column('status')
+    ride_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,49 @@
+"""add user name search index
+
+Revision ID: e2f6a9c3d817
+Revises: c9b27d41e5a3
+Create Date: 2026-10-18 12:41:15.230688
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f6a9c3d817'
+down_revision = 'c9b27d41e5a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS user_fts USING fts5(
+            name, content='user', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""")
+        op.execute("""CREATE TRIGGER IF NOT EXISTS user_fts_insert AFTER INSERT ON "user" BEGIN
+            INSERT INTO user_fts(rowid, name) VALUES (new.id, new.name);
+        END""")
+        op.execute("""CREATE TRIGGER IF NOT EXISTS user_fts_delete AFTER DELETE ON "user" BEGIN
+            INSERT INTO user_fts(user_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        END""")
+        op.execute("""CREATE TRIGGER IF NOT EXISTS user_fts_update AFTER UPDATE OF name ON "user" BEGIN
+            INSERT INTO user_fts(user_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO user_fts(rowid, name) VALUES (new.id, new.name);
+        END""")
+        op.execute("INSERT INTO user_fts(user_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute('CREATE INDEX IF NOT EXISTS ix_user_name_trgm ON "user" USING gin (name gin_trgm_ops)')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS user_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS user_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS user_fts_insert")
+        op.execute("DROP TABLE IF EXISTS user_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_user_name_trgm")
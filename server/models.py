@@ -1,20 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask import Flask
-from sqlalchemy_serializer import SerializerMixin
 from sqlalchemy import  UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum as PyEnum
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import password_hasher
+from database import RoutingSession
+from serialization import format_local_date
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # User Model
-class User(db.Model, SerializerMixin):
+class User(db.Model):
     __tablename__ = 'user'
 
-    serialize_rules = ('-ride_histories.user', '-favorites.user',)
-
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
@@ -24,10 +23,10 @@ class User(db.Model, SerializerMixin):
     favorites = db.relationship('Favorite', back_populates='user')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
 
     def to_dict(self):
         return {
@@ -36,38 +35,89 @@ class User(db.Model, SerializerMixin):
             "email": self.email
         }
 
-# Ride History Model (Updated)
-class RideHistory(db.Model, SerializerMixin):
-    serialize_rules = ('-user.ride_histories',)
+# Ride status state machine: each status lists the statuses it may move to
+class RideStatusEnum(PyEnum):
+    PENDING = "Pending"
+    GEARING_UP = "Gearing Up"
+    DISPATCHED = "Dispatched"
+    EN_ROUTE = "En Route"
+    ARRIVED = "Arrived"
+    COMPLETED = "Completed"
+    CANCELLED = "Cancelled"
+
+RIDE_STATUS_TRANSITIONS = {
+    RideStatusEnum.PENDING: {RideStatusEnum.GEARING_UP, RideStatusEnum.DISPATCHED, RideStatusEnum.CANCELLED},
+    RideStatusEnum.GEARING_UP: {RideStatusEnum.DISPATCHED, RideStatusEnum.CANCELLED},
+    RideStatusEnum.DISPATCHED: {RideStatusEnum.EN_ROUTE, RideStatusEnum.CANCELLED},
+    RideStatusEnum.EN_ROUTE: {RideStatusEnum.ARRIVED, RideStatusEnum.CANCELLED},
+    RideStatusEnum.ARRIVED: {RideStatusEnum.COMPLETED},
+    RideStatusEnum.COMPLETED: set(),
+    RideStatusEnum.CANCELLED: set(),
+}
 
+# Ride History Model (Updated)
+class RideHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     hospital_name = db.Column(db.String(100), nullable=False)
     payment_method = db.Column(db.String(20))
     date = db.Column(db.DateTime, default=datetime.utcnow)  # This already stores both date and time
+    status = db.Column(db.Enum(RideStatusEnum), nullable=False, default=RideStatusEnum.PENDING)
+    pickup_latitude = db.Column(db.Float)
+    pickup_longitude = db.Column(db.Float)
+    ambulance_id = db.Column(db.Integer, db.ForeignKey('ambulances.id'))
+    idempotency_key = db.Column(db.String(100))  # client's Idempotency-Key, if it sent one
+    idempotency_fingerprint = db.Column(db.String(64))  # hash of the request that used the key
+
+    # Serves the per-user, newest-first keyset pagination of ride history,
+    # and the dispatcher's oldest-first scan of pending rides. The unique
+    # constraint stops a retried request from creating a second ride.
+    __table_args__ = (
+        db.Index('ix_ride_history_user_id_date', 'user_id', 'date'),
+        db.Index('ix_ride_history_status_date', 'status', 'date'),
+        UniqueConstraint('user_id', 'idempotency_key', name='uq_ride_history_user_idempotency_key'),
+    )
 
     user = db.relationship('User', back_populates='ride_histories')
-
-    def to_dict(self):
-        # Convert UTC time to local time (assuming East Africa Time for Kenya)
-        local_date = self.date
-        if local_date:
-            # Add 3 hours to convert from UTC to EAT (East Africa Time)
-            from datetime import timedelta
-            local_date = local_date + timedelta(hours=3)
-            
+    ambulance = db.relationship('Ambulance')
+
+    def transition_to(self, status):
+        current = self.status or RideStatusEnum.PENDING
+        if status not in RIDE_STATUS_TRANSITIONS[current]:
+            raise ValueError(f"Cannot change ride status from {current.name} to {status.name}")
+        self.status = status
+        # A finished or cancelled ride hands its ambulance back to the fleet
+        if status in (RideStatusEnum.COMPLETED, RideStatusEnum.CANCELLED) and self.ambulance:
+            self.ambulance.is_available = True
+
+    @classmethod
+    def dict_columns(cls):
+        # Just the columns to_dict reads, for listing rides as plain row tuples
+        return (cls.id, cls.user_id, cls.hospital_name, cls.payment_method, cls.status, cls.ambulance_id,
+                cls.pickup_latitude, cls.pickup_longitude, cls.date)
+
+    @staticmethod
+    def row_to_dict(row):
+        # Works on a RideHistory or on a row selected with dict_columns()
         return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "hospital_name": self.hospital_name,
-            "payment_method": self.payment_method,
-            "date": self.date.isoformat() if self.date else None,  # Original UTC time in ISO format
-            "formatted_date": local_date.strftime("%b %d, %Y %I:%M %p") if local_date else None  # Human-readable local time
+            "id": row.id,
+            "user_id": row.user_id,
+            "hospital_name": row.hospital_name,
+            "payment_method": row.payment_method,
+            "status": row.status.name if row.status else None,
+            "ambulance_id": row.ambulance_id,
+            "pickup_latitude": row.pickup_latitude,
+            "pickup_longitude": row.pickup_longitude,
+            "date": row.date.isoformat() if row.date else None,  # Original UTC time in ISO format
+            "formatted_date": format_local_date(row.date)  # Human-readable East Africa Time
         }
 
+    def to_dict(self):
+        return RideHistory.row_to_dict(self)
+
 # Contact Us Model
-class ContactUs(db.Model, SerializerMixin):
+class ContactUs(db.Model):
     __tablename__ = 'contact_us'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -75,6 +125,7 @@ class ContactUs(db.Model, SerializerMixin):
     email = db.Column(db.String(100), nullable=False)
     phone_number = db.Column(db.String(20), nullable=False)
     message = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     def to_dict(self):
         return {
@@ -82,11 +133,12 @@ class ContactUs(db.Model, SerializerMixin):
             "name": self.name,
             "email": self.email,
             "phone_number": self.phone_number,
-            "message": self.message
+            "message": self.message,
+            "created_at": self.created_at.isoformat() if self.created_at else None
         }
 
 # Favorites Model (Separate Table)
-class Favorite(db.Model, SerializerMixin):
+class Favorite(db.Model):
     __tablename__ = 'favorites'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -103,3 +155,89 @@ class Favorite(db.Model, SerializerMixin):
             "user_id": self.user_id,
             "hospital_name": self.hospital_name
         }
+
+# Hospital Model (imported from an offline OSM/GeoJSON extract)
+class Hospital(db.Model):
+    __tablename__ = 'hospitals'
+
+    id = db.Column(db.Integer, primary_key=True)
+    osm_id = db.Column(db.String(32), unique=True)
+    name = db.Column(db.String(255), nullable=False)
+    type = db.Column(db.String(50))
+    address = db.Column(db.String(255))
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "osm_id": self.osm_id,
+            "name": self.name,
+            "type": self.type,
+            "address": self.address,
+            "latitude": self.latitude,
+            "longitude": self.longitude
+        }
+
+# Ambulance Model (fleet units the dispatcher assigns to pending rides)
+class Ambulance(db.Model):
+    __tablename__ = 'ambulances'
+
+    id = db.Column(db.Integer, primary_key=True)
+    vehicle_no = db.Column(db.String(20), unique=True, nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    is_available = db.Column(db.Boolean, nullable=False, default=True, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "vehicle_no": self.vehicle_no,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "is_available": self.is_available,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+# Pub/sub events shared between gunicorn workers (used when PUBSUB_BACKEND=database)
+class PubSubEvent(db.Model):
+    __tablename__ = 'pubsub_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+# Rate limit buckets shared between gunicorn workers (used when RATE_LIMIT_BACKEND=database)
+class RateLimitBucket(db.Model):
+    __tablename__ = 'rate_limit_buckets'
+
+    key = db.Column(db.String(200), primary_key=True)
+    tat = db.Column(db.Float, nullable=False)  # when the bucket is next full again, in epoch seconds
+
+# Ride counts per UTC hour, hospital and payment method, kept current by triggers on ride_history (see rollups.py)
+class RideRollup(db.Model):
+    __tablename__ = 'ride_rollups'
+
+    hour_start = db.Column(db.DateTime, primary_key=True)
+    hospital_name = db.Column(db.String(100), primary_key=True)
+    payment_method = db.Column(db.String(20), primary_key=True)  # '' for rides without one
+    rides = db.Column(db.Integer, nullable=False, default=0)
+
+# Background jobs run by `flask jobs-worker` (see jobs.py)
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # "queued", or "failed" once out of attempts
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False)  # due time; pushed forward while a worker holds the job
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+
+    # Workers look for the earliest due job that is still queued
+    __table_args__ = (db.Index('ix_jobs_status_run_at', 'status', 'run_at'),)
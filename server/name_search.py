@@ -0,0 +1,137 @@
+import bisect
+import heapq
+import re
+import threading
+from collections import Counter
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Trigrams shared by more than this many names (e.g. "hos", "ita") are too common
+# to narrow anything down, so they are only used for scoring, not candidate lookup.
+COMMON_TRIGRAM_LIMIT = 500
+MAX_CANDIDATES = 64
+MIN_SIMILARITY = 0.3
+# Most candidate names score_names accepts in one call
+MAX_MATCH_NAMES = 500
+
+
+def normalize(text):
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def trigrams(normalized):
+    # pg_trgm style: every word padded with two leading blanks and one trailing blank
+    grams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def match_score(normalized_query, query_grams, name, grams):
+    # Exact > prefix > whole-word substring > trigram similarity; None when it does not match
+    shared = len(query_grams & grams)
+    similarity = shared / (len(query_grams) + len(grams) - shared)
+    if name == normalized_query:
+        return 3.0
+    if name.startswith(normalized_query):
+        return 2.0 + similarity
+    if f" {normalized_query}" in f" {name}":
+        return 1.5 + similarity
+    if similarity >= MIN_SIMILARITY:
+        return similarity
+    return None
+
+
+def score_names(query, names):
+    """Score the given names against ``query``, best first, leaving out those that do not match."""
+    normalized = normalize(query)
+    if not normalized:
+        return []
+    query_grams = trigrams(normalized)
+    scored = []
+    for name in dict.fromkeys(names):
+        candidate = normalize(name)
+        score = match_score(normalized, query_grams, candidate, trigrams(candidate)) if candidate else None
+        if score is not None:
+            scored.append({"name": name, "score": round(score, 3)})
+    return sorted(scored, key=lambda match: -match["score"])
+
+
+class NameSearchIndex:
+    # Autocomplete over hospital names: a sorted word list answers prefix queries
+    # with bisect, and trigram postings give typo-tolerant candidates.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._ids = {}        # normalized name -> id
+        self._payloads = []   # id -> payload dict
+        self._names = []      # id -> normalized name
+        self._grams = []      # id -> trigram set
+        self._postings = {}   # trigram -> list of ids
+        self._words = []      # sorted (word, id) pairs
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def load(self, hospitals):
+        with self._lock:
+            self._reset()
+            for hospital in hospitals:
+                self._add(hospital.name, hospital.to_dict())
+            self._words.sort()
+
+    def _add(self, name, payload):
+        normalized = normalize(name or "")
+        if not normalized or normalized in self._ids:
+            return None
+        name_id = len(self._payloads)
+        grams = trigrams(normalized)
+        self._ids[normalized] = name_id
+        self._payloads.append(payload)
+        self._names.append(normalized)
+        self._grams.append(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(name_id)
+        self._words.extend((word, name_id) for word in normalized.split())
+        return name_id
+
+    def _prefix_matches(self, prefix, limit):
+        words = self._words
+        matches = []
+        i = bisect.bisect_left(words, (prefix, -1))
+        while i < len(words) and words[i][0].startswith(prefix) and len(matches) < limit:
+            matches.append(words[i][1])
+            i += 1
+        return matches
+
+    def search(self, query, limit=10):
+        normalized = normalize(query)
+        if not normalized:
+            return []
+        query_grams = trigrams(normalized)
+        last_word = normalized.split()[-1]
+
+        # Candidates: names with a word starting with the last (possibly partial) query word,
+        # plus names sharing the query's selective trigrams
+        candidates = dict.fromkeys(self._prefix_matches(last_word, MAX_CANDIDATES), 0)
+        hits = Counter()
+        for gram in query_grams:
+            posting = self._postings.get(gram, ())
+            if len(posting) <= COMMON_TRIGRAM_LIMIT:
+                hits.update(posting)
+        for name_id, _ in hits.most_common(MAX_CANDIDATES):
+            candidates.setdefault(name_id, 0)
+
+        scored = []
+        for name_id in candidates:
+            name = self._names[name_id]
+            score = match_score(normalized, query_grams, name, self._grams[name_id])
+            if score is not None:
+                scored.append((score, -len(name), name_id))
+
+        return [dict(self._payloads[name_id], score=round(score, 3))
+                for score, _, name_id in heapq.nlargest(limit, scored)]
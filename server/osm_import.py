@@ -0,0 +1,99 @@
+import json
+
+# Same facility tags the client used to ask Overpass for
+HOSPITAL_TAGS = {
+    "amenity": {"hospital", "clinic"},
+    "healthcare": {"hospital", "centre", "clinic"},
+}
+
+
+def is_medical_facility(tags):
+    return any(tags.get(key) in values for key, values in HOSPITAL_TAGS.items())
+
+
+def format_address(tags):
+    street = tags.get("addr:street", "")
+    housenumber = tags.get("addr:housenumber", "")
+    city = tags.get("addr:city", "")
+
+    if street or housenumber or city:
+        return f"{street} {housenumber}, {city}".strip()
+    return None
+
+
+def _centroid(coordinates):
+    # Drill down to the first ring of a (Multi)Polygon / LineString and average it
+    while coordinates and isinstance(coordinates[0][0], list):
+        coordinates = coordinates[0]
+    if not coordinates:
+        return None
+    lng = sum(point[0] for point in coordinates) / len(coordinates)
+    lat = sum(point[1] for point in coordinates) / len(coordinates)
+    return lat, lng
+
+
+def _from_tags(osm_id, tags, position):
+    if not position or not is_medical_facility(tags):
+        return None
+    name = tags.get("name") or tags.get("name:en")
+    if not name:
+        return None
+    return {
+        "osm_id": osm_id,
+        "name": name[:255],
+        "type": tags.get("amenity") or tags.get("healthcare") or "medical",
+        "address": format_address(tags),
+        "latitude": position[0],
+        "longitude": position[1]
+    }
+
+
+def parse_overpass_element(element):
+    if element.get("type") == "node":
+        position = (element.get("lat"), element.get("lon"))
+    elif element.get("center"):
+        position = (element["center"]["lat"], element["center"]["lon"])
+    else:
+        position = None
+    if position and None in position:
+        position = None
+    return _from_tags(f"{element.get('type')}/{element.get('id')}", element.get("tags") or {}, position)
+
+
+def parse_geojson_feature(feature):
+    geometry = feature.get("geometry") or {}
+    properties = feature.get("properties") or {}
+    # osmtogeojson nests tags under "tags"; ogr2ogr / osmium export them flat
+    tags = properties.get("tags") or properties
+
+    if geometry.get("type") == "Point":
+        lng, lat = geometry["coordinates"][:2]
+        position = (lat, lng)
+    else:
+        position = _centroid(geometry.get("coordinates") or [])
+
+    osm_id = feature.get("id") or properties.get("@id") or properties.get("id")
+    return _from_tags(str(osm_id) if osm_id is not None else None, tags, position)
+
+
+def load_hospitals(path):
+    """Parse an Overpass JSON dump or a GeoJSON FeatureCollection into Hospital rows."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    if "elements" in data:
+        rows = (parse_overpass_element(element) for element in data["elements"])
+    elif data.get("type") == "FeatureCollection":
+        rows = (parse_geojson_feature(feature) for feature in data.get("features", []))
+    else:
+        raise ValueError("Expected an Overpass JSON dump or a GeoJSON FeatureCollection")
+
+    seen = set()
+    for row in rows:
+        if row is None:
+            continue
+        if row["osm_id"] is not None:
+            if row["osm_id"] in seen:
+                continue
+            seen.add(row["osm_id"])
+        yield row
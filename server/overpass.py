@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from osm_import import HOSPITAL_TAGS, parse_overpass_element
+from spatial import haversine_km
+
+logger = logging.getLogger(__name__)
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+
+# Cache tiles are 0.01 degrees (~1.1 km) square; every tile is fetched around its
+# centre with enough extra radius to cover any point inside it.
+TILE_DEG = 0.01
+TILE_PAD_METERS = 1000
+RADIUS_STEP_METERS = 1000
+
+
+def build_query(lat, lng, radius):
+    clauses = "".join(
+        f'{kind}["{key}"="{value}"](around:{radius},{lat},{lng});'
+        for key, values in HOSPITAL_TAGS.items()
+        for value in sorted(values)
+        for kind in ("node", "way", "relation")
+    )
+    return f"[out:json];({clauses});out center;"
+
+
+class HttpOverpassUpstream:
+    def __init__(self, url=OVERPASS_URL, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, lat, lng, radius):
+        body = build_query(lat, lng, radius).encode("utf-8")
+        with urllib.request.urlopen(urllib.request.Request(self.url, data=body), timeout=self.timeout) as response:
+            data = json.load(response)
+        return [row for row in map(parse_overpass_element, data.get("elements", [])) if row]
+
+
+class FixtureUpstream:
+    # Local stand-in for Overpass that answers from a saved Overpass JSON dump
+    def __init__(self, path):
+        with open(path, encoding="utf-8") as f:
+            elements = json.load(f).get("elements", [])
+        self.hospitals = [row for row in map(parse_overpass_element, elements) if row]
+
+    def __call__(self, lat, lng, radius):
+        return [h for h in self.hospitals
+                if haversine_km(lat, lng, h["latitude"], h["longitude"]) * 1000 <= radius]
+
+
+class OverpassCache:
+    """Tile-keyed LRU cache in front of an Overpass-style upstream.
+
+    Fresh entries are served directly; stale ones are served immediately while a
+    background refresh runs. A miss answers at once with an empty result and
+    starts the fetch, so no request waits on the upstream. A tile whose fetch
+    failed answers "error" for ``error_ttl`` seconds without asking again, so
+    an Overpass outage is not hit by every request.
+    """
+
+    def __init__(self, upstream, max_entries=512, ttl=3600, stale_ttl=86400,
+                 error_ttl=30, persist_path=None, max_workers=2):
+        self.upstream = upstream
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self.persist_path = persist_path
+        self._entries = OrderedDict()
+        self._errors = {}  # tile key -> when its last fetch failed
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="overpass")
+        if persist_path:
+            self._load()
+
+    @staticmethod
+    def tile_key(lat, lng, radius):
+        radius = max(RADIUS_STEP_METERS, int(-(-radius // RADIUS_STEP_METERS)) * RADIUS_STEP_METERS)
+        return (round(round(lat / TILE_DEG) * TILE_DEG, 2), round(round(lng / TILE_DEG) * TILE_DEG, 2), radius)
+
+    def lookup(self, lat, lng, radius):
+        """Return ``(hospitals, state)`` where state is "hit", "stale", "miss" or "error"."""
+        key = self.tile_key(lat, lng, radius)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                fetched_at, hospitals = entry
+                age = now - fetched_at
+                if age > self.stale_ttl:
+                    entry = None
+            failed = now - self._errors.get(key, float("-inf")) <= self.error_ttl
+
+        if entry is not None:
+            if age <= self.ttl:
+                return self._around(hospitals, lat, lng, radius), "hit"
+            if not failed:
+                self._refresh(key)
+            return self._around(hospitals, lat, lng, radius), "stale"
+
+        if failed:
+            return [], "error"
+        self._refresh(key)
+        return [], "miss"
+
+    def _refresh(self, key):
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._executor.submit(self._fetch, key)
+                self._inflight[key] = future
+            return future
+
+    def _fetch(self, key):
+        lat, lng, radius = key
+        try:
+            hospitals = self.upstream(lat, lng, radius + TILE_PAD_METERS)
+        except Exception:
+            logger.exception("Overpass lookup failed for tile %s", key)
+            with self._lock:
+                self._errors[key] = time.time()
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        with self._lock:
+            self._errors.pop(key, None)
+            self._entries[key] = (time.time(), hospitals)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.persist_path:
+            self._save()
+        return hospitals
+
+    @staticmethod
+    def _around(hospitals, lat, lng, radius):
+        results = []
+        for hospital in hospitals:
+            distance = haversine_km(lat, lng, hospital["latitude"], hospital["longitude"])
+            if distance * 1000 <= radius:
+                results.append(dict(hospital, distance=round(distance, 2)))
+        results.sort(key=lambda h: h["distance"])
+
+        # Same facility is often tagged as both a node and a building; keep the nearest by name
+        seen = set()
+        unique = []
+        for hospital in results:
+            if hospital["name"] not in seen:
+                seen.add(hospital["name"])
+                unique.append(hospital)
+        return unique
+
+    def _load(self):
+        try:
+            with open(self.persist_path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for lat, lng, radius, fetched_at, hospitals in saved:
+                self._entries[(lat, lng, radius)] = (fetched_at, hospitals)
+
+    def _save(self):
+        with self._lock:
+            snapshot = [[*key, fetched_at, hospitals] for key, (fetched_at, hospitals) in self._entries.items()]
+        tmp_path = f"{self.persist_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.persist_path)
+        except OSError:
+            logger.exception("Could not persist Overpass cache to %s", self.persist_path)
@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHashingBusy(Exception):
+    pass
+
+
+def _hashing_executor(max_workers):
+    # In a gevent worker, threading is monkey-patched and a ThreadPoolExecutor's threads are
+    # greenlets on the event loop, so hashing would stall every other request in the worker.
+    # gevent's executor runs on real OS threads and its futures wait cooperatively.
+    try:
+        from gevent import monkey
+        from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+    except ImportError:
+        pass
+    else:
+        if monkey.is_module_patched("threading"):
+            return GeventThreadPoolExecutor(max_workers=max_workers)
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on a small dedicated thread pool.
+
+    hashlib releases the GIL while it works, so request threads stay responsive,
+    and the bounded number of slots means a login burst is turned away with
+    ``PasswordHashingBusy`` instead of eating every worker.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self.configure()
+
+    def configure(self, method="scrypt", max_workers=2, max_pending=16, wait_timeout=5.0):
+        # Full method string (e.g. "pbkdf2:sha256:600000") as it is stored at the front of new hashes
+        self.method = method
+        self.current_method = generate_password_hash("", method=method).split("$", 1)[0]
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        old_executor = self._executor
+        self._executor = _hashing_executor(max_workers)
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise PasswordHashingBusy()
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        # Any hash made with a different algorithm or cost, stronger or weaker, is replaced
+        return password_hash.split("$", 1)[0] != self.current_method
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, or_, select
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    # max_pending=0 never drops messages; only for consumers that keep up, like cache invalidation
+    def __init__(self, broker, channels, max_pending=100):
+        self.broker = broker
+        self.channels = channels
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def get(self, timeout=None):
+        # Next (channel, message) pair, or None if nothing arrived within timeout
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Channel pub/sub between threads of one process."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, *channels, max_pending=100):
+        subscription = Subscription(self, channels, max_pending)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def publish(self, channel, message):
+        self._deliver(channel, message)
+
+    def _deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription._queue.put_nowait((channel, message))
+            except queue.Full:
+                # A stalled client must not block publishers; it will resync on reconnect
+                logger.warning("Dropping %s message for a slow subscriber", channel)
+
+
+class DatabaseBroker(InProcessBroker):
+    """Pub/sub shared by every gunicorn worker through an events table.
+
+    Publishing inserts a row; each worker that has subscribers polls for new
+    rows and fans them out locally. Rows older than ``retention`` are pruned.
+
+    Ids are handed out at insert but become visible at commit, so on Postgres
+    a row can appear after a higher id has already been read. Ids the poller
+    skips over are therefore re-read for ``gap_timeout`` seconds, until their
+    row shows up or the insert is taken to have rolled back. Such a late row
+    is delivered after newer ones.
+    """
+
+    def __init__(self, engine, table, poll_interval=0.5, retention=timedelta(hours=1), gap_timeout=30,
+                 max_gaps=1000):
+        super().__init__()
+        self.engine = engine
+        self.table = table
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.gap_timeout = gap_timeout
+        self.max_gaps = max_gaps
+        self._pid = None
+
+    def subscribe(self, *channels, max_pending=100):
+        self._ensure_started()
+        return super().subscribe(*channels, max_pending=max_pending)
+
+    def publish(self, channel, message):
+        with self.engine.begin() as conn:
+            conn.execute(insert(self.table).values(
+                channel=channel, payload=json.dumps(message), created_at=datetime.utcnow()
+            ))
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                with self.engine.connect() as conn:
+                    last_id = conn.execute(select(func.max(self.table.c.id))).scalar() or 0
+                threading.Thread(target=self._poll, args=(last_id,), name="pubsub-poll", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _poll(self, last_id):
+        table = self.table
+        gaps = {}  # skipped-over id -> when to stop waiting for it
+        last_prune = 0
+        while True:
+            try:
+                now = time.monotonic()
+                for gap_id in [gap_id for gap_id, deadline in gaps.items() if deadline < now]:
+                    del gaps[gap_id]
+                condition = table.c.id > last_id
+                if gaps:
+                    condition = or_(condition, table.c.id.in_(list(gaps)))
+                with self.engine.connect() as conn:
+                    rows = conn.execute(
+                        select(table.c.id, table.c.channel, table.c.payload).where(condition).order_by(table.c.id)
+                    ).all()
+                for row_id, channel, payload in rows:
+                    if row_id > last_id:
+                        for gap_id in range(max(last_id + 1, row_id - self.max_gaps), row_id):
+                            gaps[gap_id] = now + self.gap_timeout
+                        last_id = row_id
+                    else:
+                        gaps.pop(row_id, None)
+                    self._deliver(channel, json.loads(payload))
+                while len(gaps) > self.max_gaps:
+                    gap_id = min(gaps)
+                    logger.warning("Giving up on pub/sub event %d: too many uncommitted ids", gap_id)
+                    del gaps[gap_id]
+
+                if time.monotonic() - last_prune > 60:
+                    with self.engine.begin() as conn:
+                        conn.execute(delete(table).where(table.c.created_at < datetime.utcnow() - self.retention))
+                    last_prune = time.monotonic()
+            except Exception:
+                logger.exception("Polling pub/sub events failed")
+            time.sleep(self.poll_interval)
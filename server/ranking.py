@@ -0,0 +1,78 @@
+import numpy as np
+
+from spatial import EARTH_RADIUS_KM
+
+# Average ambulance speed the client has always assumed for its ETA estimate
+DEFAULT_SPEED_KMH = 60.0
+
+# Upper bound on the size of one (positions x hospitals) distance matrix, in cells
+MAX_MATRIX_CELLS = 4_000_000
+
+
+def great_circle_km(lat, lng, lats, lngs):
+    """Haversine distance from each (lat, lng) row to every (lats, lngs) column, as an m x n matrix."""
+    lat = np.radians(np.atleast_1d(lat))[:, None]
+    lng = np.radians(np.atleast_1d(lng))[:, None]
+    lats = np.radians(np.atleast_1d(lats))[None, :]
+    lngs = np.radians(np.atleast_1d(lngs))[None, :]
+
+    a = (np.sin((lats - lat) / 2) ** 2 +
+         np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def eta_minutes(distance_km, speed_kmh=DEFAULT_SPEED_KMH):
+    return np.maximum(np.rint(distance_km / speed_kmh * 60), 1).astype(int)
+
+
+class HospitalRanker:
+    # Keeps hospital coordinates as contiguous arrays so a whole batch of
+    # positions can be ranked against every facility in one vectorized pass.
+
+    def __init__(self):
+        self._lats = np.empty(0)
+        self._lngs = np.empty(0)
+        self._payloads = []
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def load(self, hospitals):
+        payloads = [h.to_dict() for h in hospitals]
+        lats = np.fromiter((p["latitude"] for p in payloads), dtype=float, count=len(payloads))
+        lngs = np.fromiter((p["longitude"] for p in payloads), dtype=float, count=len(payloads))
+        # Swap all three together so a concurrent rank() sees a consistent snapshot
+        self._lats, self._lngs, self._payloads = lats, lngs, payloads
+
+    def rank(self, positions, limit=10, radius_km=None, speed_kmh=DEFAULT_SPEED_KMH):
+        lats, lngs, payloads = self._lats, self._lngs, self._payloads
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        if not payloads:
+            return [[] for _ in range(len(positions))]
+
+        k = min(limit, len(payloads))
+        chunk = max(1, MAX_MATRIX_CELLS // len(payloads))
+        rankings = []
+
+        for start in range(0, len(positions), chunk):
+            block = positions[start:start + chunk]
+            distances = great_circle_km(block[:, 0], block[:, 1], lats, lngs)
+            if radius_km is not None:
+                distances[distances > radius_km] = np.inf
+
+            # Partial sort: only the k best columns of each row get fully ordered
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+            order = np.argsort(nearest_distances, axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+            nearest_distances = np.take_along_axis(nearest_distances, order, axis=1)
+            etas = eta_minutes(np.where(np.isinf(nearest_distances), 0, nearest_distances), speed_kmh)
+
+            for row_idx, row_distances, row_etas in zip(nearest, nearest_distances, etas):
+                rankings.append([
+                    dict(payloads[i], distance=round(float(d), 2), eta_minutes=int(eta))
+                    for i, d, eta in zip(row_idx, row_distances, row_etas)
+                    if np.isfinite(d)
+                ])
+
+        return rankings
@@ -0,0 +1,128 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+_RATE = re.compile(r"^\s*(\d+)\s*/\s*(second|minute|hour|day)\s*$")
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Rate limit exceeded")
+        self.retry_after = retry_after
+
+
+def parse_rate(rate):
+    # "5/minute" -> (5, 60)
+    match = _RATE.match(rate)
+    if not match:
+        raise ValueError(f"Invalid rate {rate!r}, expected e.g. '5/minute'")
+    return int(match.group(1)), _PERIODS[match.group(2)]
+
+
+# Buckets are stored in GCRA form: instead of a token count and a refill
+# time, each key keeps one timestamp ("tat") at which its bucket will be
+# full again. Spending a token pushes it forward by one refill interval, and
+# a request is allowed while tat stays within `burst` intervals of now. The
+# behaviour is the same as a token bucket, but the state is a single number,
+# so the shared backend can update it in one conditional UPDATE.
+
+class MemoryBucketStore:
+    """Buckets in this process only; each gunicorn worker limits on its own."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._tats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key, interval, burst, now=None):
+        # Seconds until a token is available; 0 means one was taken
+        now = time.time() if now is None else now
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            if tat + interval - now > burst * interval:
+                return tat + interval - now - burst * interval
+            self._tats[key] = tat + interval
+            self._tats.move_to_end(key)
+            while len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+            return 0
+
+
+class DatabaseBucketStore:
+    """Buckets in a table, so limits hold across every gunicorn worker."""
+
+    def __init__(self, engine, table, prune_interval=60):
+        self.engine = engine
+        self.table = table
+        self.prune_interval = prune_interval
+        self._last_prune = 0
+
+    def acquire(self, key, interval, burst, now=None):
+        now = time.time() if now is None else now
+        table = self.table
+        current = case((table.c.tat > now, table.c.tat), else_=now)
+        with self.engine.begin() as conn:
+            # Two attempts: a worker that loses the race to create a new key retries the update
+            for _ in range(2):
+                taken = conn.execute(
+                    update(table)
+                    .where(table.c.key == key, current + interval - now <= burst * interval)
+                    .values(tat=current + interval)
+                ).rowcount
+                tat = None
+                if not taken:
+                    tat = conn.execute(select(table.c.tat).where(table.c.key == key)).scalar()
+                    if tat is None:
+                        taken = conn.execute(self._insert_new(key, now + interval)).rowcount
+                        if not taken:
+                            continue
+                break
+            if now - self._last_prune > self.prune_interval:
+                # Buckets that have refilled completely carry no state worth keeping
+                conn.execute(delete(table).where(table.c.tat < now))
+                self._last_prune = now
+        if taken:
+            return 0
+        if tat is None:
+            return interval
+        return max(tat, now) + interval - now - burst * interval
+
+    def _insert_new(self, key, tat):
+        dialect = self.engine.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            module = sqlite if dialect == "sqlite" else postgresql
+            return module.insert(self.table).values(key=key, tat=tat).on_conflict_do_nothing()
+        return insert(self.table).values(key=key, tat=tat)
+
+
+class RateLimiter:
+    def __init__(self, store=None):
+        self.store = store or MemoryBucketStore()
+        self.enabled = False
+
+    def limit(self, name, rate, per="ip"):
+        """Limit a view to ``rate`` (e.g. "5/minute") per client IP or, with ``per="user"``,
+        per JWT identity; place it below ``@jwt_required`` in that case. The full
+        allowance may be used as a burst."""
+        count, period = parse_rate(rate)
+        interval = period / count
+
+        def decorator(f):
+            @wraps(f)
+            def wrapped(*args, **kwargs):
+                if self.enabled:
+                    client = get_jwt_identity() if per == "user" else request.remote_addr
+                    retry_after = self.store.acquire(f"{name}:{client}", interval, count)
+                    if retry_after:
+                        raise RateLimited(retry_after)
+                return f(*args, **kwargs)
+            return wrapped
+        return decorator
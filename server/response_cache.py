@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, g, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "response-cache"
+
+
+def content_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """Per-user cache of rendered GET responses, keyed by a version per (user, scope).
+
+    A write bumps the version, which orphans every cached page for that user
+    and scope. Cached bodies carry a strong content-hash ETag, so a matching
+    ``If-None-Match`` is answered with 304 straight from memory. Bumps are also
+    published on a broker so other workers drop their copies; ``ttl`` bounds
+    how long a worker that missed one can serve a stale page.
+
+    With ``enabled`` off, nothing is stored: every request renders afresh
+    and only the ETag / 304 handling is kept. That is the safe setting
+    when invalidations cannot reach the other workers.
+    """
+
+    def __init__(self, max_entries=10000, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = True
+        self.broker = None
+        self._versions = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._origin = None
+
+    def attach(self, broker):
+        self.broker = broker
+
+    def invalidate(self, user_id, scope):
+        self._bump(str(user_id), scope)
+        if self.broker is not None:
+            self.broker.publish(INVALIDATION_CHANNEL, {"user_id": str(user_id), "scope": scope,
+                                                       "origin": self._origin})
+
+    def cached(self, scope):
+        """Cache a ``@jwt_required`` GET view per user and query string."""
+        def decorator(f):
+            @wraps(f)
+            def wrapped(*args, **kwargs):
+                if not self.enabled:
+                    response = make_response(f(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    body = response.get_data()
+                    headers = [(k, v) for k, v in response.headers if k.lower() != "content-length"]
+                    return self._conditional(content_etag(body), body, headers)
+                self._ensure_listening()
+                user_id = str(get_jwt_identity())
+                key = (user_id, scope, request.full_path)
+                with self._lock:
+                    version = self._versions.get((user_id, scope), 0)
+                    entry = self._entries.get(key)
+                    if entry and entry[0] == version and entry[1] > time.monotonic():
+                        self._entries.move_to_end(key)
+                    else:
+                        entry = None
+
+                if entry is None:
+                    # A lagging replica could miss the write that just bumped the version, and
+                    # its page would then be cached under the new version; render from the primary
+                    g.use_primary = True
+                    try:
+                        response = make_response(f(*args, **kwargs))
+                    finally:
+                        g.use_primary = False
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    body = response.get_data()
+                    headers = [(k, v) for k, v in response.headers if k.lower() != "content-length"]
+                    entry = (version, time.monotonic() + self.ttl, content_etag(body), body, headers)
+                    with self._lock:
+                        # A write that landed while rendering already moved the version on
+                        if self._versions.get((user_id, scope), 0) == version:
+                            self._entries[key] = entry
+                            self._entries.move_to_end(key)
+                            while len(self._entries) > self.max_entries:
+                                self._entries.popitem(last=False)
+
+                _, _, etag, body, headers = entry
+                return self._conditional(etag, body, headers)
+            return wrapped
+        return decorator
+
+    @staticmethod
+    def _conditional(etag, body, headers):
+        response = Response(body, headers=headers)
+        response.set_etag(etag)
+        # The browser keeps a private copy but must revalidate it on every use
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response.make_conditional(request)
+
+    def _bump(self, user_id, scope):
+        with self._lock:
+            self._versions[(user_id, scope)] = self._versions.get((user_id, scope), 0) + 1
+
+    def _ensure_listening(self):
+        if self.broker is None or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._origin = uuid.uuid4().hex
+                # A dropped invalidation would leave a stale page cached for the whole TTL
+                subscription = self.broker.subscribe(INVALIDATION_CHANNEL, max_pending=0)
+                threading.Thread(target=self._listen, args=(subscription,), name="response-cache",
+                                 daemon=True).start()
+                self._pid = os.getpid()
+
+    def _listen(self, subscription):
+        while True:
+            _, message = subscription.get()
+            if message.get("origin") == self._origin:
+                continue  # already applied locally
+            try:
+                self._bump(message["user_id"], message["scope"])
+            except Exception:
+                logger.exception("Bad response cache invalidation message")
@@ -0,0 +1,164 @@
+import logging
+from datetime import timedelta
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+logger = logging.getLogger(__name__)
+
+# SQLAlchemy stores SQLite DateTimes as text in this layout; buckets written by the
+# triggers must use it too, or range comparisons against bound datetimes go wrong
+SQLITE_HOUR_FORMAT = "%Y-%m-%d %H:00:00.000000"
+
+SQLITE_ROLLUP_DDL = [
+    f"""CREATE TRIGGER IF NOT EXISTS ride_rollups_insert AFTER INSERT ON ride_history
+    WHEN new.date IS NOT NULL BEGIN
+        INSERT INTO ride_rollups (hour_start, hospital_name, payment_method, rides)
+        VALUES (strftime('{SQLITE_HOUR_FORMAT}', new.date), new.hospital_name, coalesce(new.payment_method, ''), 1)
+        ON CONFLICT (hour_start, hospital_name, payment_method) DO UPDATE SET rides = rides + 1;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS ride_rollups_delete AFTER DELETE ON ride_history
+    WHEN old.date IS NOT NULL BEGIN
+        UPDATE ride_rollups SET rides = rides - 1
+        WHERE hour_start = strftime('{SQLITE_HOUR_FORMAT}', old.date) AND hospital_name = old.hospital_name
+          AND payment_method = coalesce(old.payment_method, '');
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS ride_rollups_update AFTER UPDATE OF date, hospital_name, payment_method
+    ON ride_history BEGIN
+        UPDATE ride_rollups SET rides = rides - 1
+        WHERE old.date IS NOT NULL AND hour_start = strftime('{SQLITE_HOUR_FORMAT}', old.date)
+          AND hospital_name = old.hospital_name AND payment_method = coalesce(old.payment_method, '');
+        INSERT INTO ride_rollups (hour_start, hospital_name, payment_method, rides)
+        SELECT strftime('{SQLITE_HOUR_FORMAT}', new.date), new.hospital_name, coalesce(new.payment_method, ''), 1
+        WHERE new.date IS NOT NULL
+        ON CONFLICT (hour_start, hospital_name, payment_method) DO UPDATE SET rides = rides + 1;
+    END""",
+]
+
+POSTGRES_ROLLUP_DDL = [
+    """CREATE OR REPLACE FUNCTION ride_rollups_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.date IS NOT NULL THEN
+            UPDATE ride_rollups SET rides = rides - 1
+            WHERE hour_start = date_trunc('hour', OLD.date) AND hospital_name = OLD.hospital_name
+              AND payment_method = coalesce(OLD.payment_method, '');
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.date IS NOT NULL THEN
+            INSERT INTO ride_rollups (hour_start, hospital_name, payment_method, rides)
+            VALUES (date_trunc('hour', NEW.date), NEW.hospital_name, coalesce(NEW.payment_method, ''), 1)
+            ON CONFLICT (hour_start, hospital_name, payment_method)
+            DO UPDATE SET rides = ride_rollups.rides + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS ride_rollups_apply ON ride_history",
+    """CREATE TRIGGER ride_rollups_apply
+    AFTER INSERT OR DELETE OR UPDATE OF date, hospital_name, payment_method ON ride_history
+    FOR EACH ROW EXECUTE FUNCTION ride_rollups_apply()""",
+]
+
+DIMENSIONS = ("hospital_name", "payment_method", "hour_start")
+
+# A stats query reads at most one row per hour and combination in its range, so the range is capped
+MAX_STATS_RANGE = timedelta(days=31)
+
+
+def floor_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value):
+    floored = floor_hour(value)
+    return floored if floored == value else floored + timedelta(hours=1)
+
+
+class RideRollups:
+    # Ride counts per hour, hospital and payment method. Like the user search
+    # index, the counters are maintained by triggers on ride_history, in the
+    # same transaction as the ride itself, so rides inserted through the ORM,
+    # the group commit writer or the bulk seeder are all counted. Dashboard
+    # queries then sum at most one row per hour and combination instead of
+    # grouping the whole ride table.
+    #
+    # The price is a hot row: every ride bumps the counter for its hour,
+    # hospital and payment method, and holds that row's lock until the ride
+    # commits. On Postgres, concurrent requests for the same combination
+    # therefore commit one after another. The group commit writer, which
+    # puts a batch in one transaction, takes each lock once per batch.
+
+    def __init__(self, rollup_model, ride_model):
+        self.Rollup = rollup_model
+        self.Ride = ride_model
+        self.maintained = False
+
+    def setup(self, engine):
+        try:
+            with engine.begin() as conn:
+                if engine.dialect.name == "sqlite":
+                    created = conn.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'ride_rollups_insert'"
+                    )).first() is None
+                    statements = SQLITE_ROLLUP_DDL
+                elif engine.dialect.name == "postgresql":
+                    created = conn.execute(text(
+                        "SELECT 1 FROM pg_trigger WHERE tgname = 'ride_rollups_apply'"
+                    )).first() is None
+                    statements = POSTGRES_ROLLUP_DDL
+                else:
+                    logger.warning("Ride rollups are not maintained on %s", engine.dialect.name)
+                    return
+                for statement in statements:
+                    # Not text(): the strftime format's ':00' would be taken for a bind parameter
+                    conn.exec_driver_sql(statement)
+                if created:
+                    # Count the rides that existed before the triggers did
+                    self.backfill(conn)
+            self.maintained = True
+        except (OperationalError, ProgrammingError):
+            logger.warning("Ride rollups unavailable", exc_info=True)
+
+    def hour_bucket(self, column, dialect):
+        if dialect == "sqlite":
+            return func.strftime(SQLITE_HOUR_FORMAT, column)
+        return func.date_trunc("hour", column)
+
+    def backfill(self, conn, since=None):
+        # Recount buckets from ride_history, all of them or those from `since` on.
+        # Returns the number of rides counted.
+        Rollup, Ride = self.Rollup.__table__, self.Ride.__table__
+        dialect = conn.dialect.name
+        if dialect == "postgresql":
+            # Hold off ride writes so the triggers cannot count a ride the recount also sees
+            conn.execute(text("LOCK TABLE ride_history IN SHARE MODE"))
+        clear = delete(Rollup)
+        rides = Ride.c.date.isnot(None)
+        if since is not None:
+            since = floor_hour(since)
+            clear = clear.where(Rollup.c.hour_start >= since)
+            rides = rides & (Ride.c.date >= since)
+        conn.execute(clear)
+
+        bucket = self.hour_bucket(Ride.c.date, dialect)
+        payment_method = func.coalesce(Ride.c.payment_method, "")
+        counts = (select(bucket, Ride.c.hospital_name, payment_method, func.count())
+                  .where(rides).group_by(bucket, Ride.c.hospital_name, payment_method))
+        conn.execute(insert(Rollup).from_select(
+            ["hour_start", "hospital_name", "payment_method", "rides"], counts))
+        total = select(func.coalesce(func.sum(Rollup.c.rides), 0))
+        if since is not None:
+            total = total.where(Rollup.c.hour_start >= since)
+        return conn.execute(total).scalar()
+
+    def totals(self, session, dimension, start, end):
+        # [(value, rides)] for rides in [start, end), which must be whole hours
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown rollup dimension {dimension!r}")
+        Rollup = self.Rollup
+        column = getattr(Rollup, dimension)
+        rides = func.sum(Rollup.rides)
+        statement = (select(column, rides)
+                     .where(Rollup.hour_start >= start, Rollup.hour_start < end)
+                     .group_by(column).having(rides > 0))
+        statement = statement.order_by(column if dimension == "hour_start" else rides.desc(), column)
+        return session.execute(statement).all()
@@ -1,110 +1,184 @@
+"""Seed the ambulance app database.
+
+Without options the tables are cleared and the small sample data set is
+loaded. With ``--users`` synthetic data is generated and bulk-inserted in
+batches (executemany), so millions of rows take minutes rather than hours.
+The same options and ``--seed`` always produce the same rows. Synthetic users
+are ``loadtest{i}@example.com`` and all share the password ``password123``,
+which is hashed once.
+
+    python seed.py
+    python seed.py --users 1000000 --rides-per-user 5 --favorites-per-user 2 --contacts 200000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+
 from app import app, db
 from models import User, RideHistory, ContactUs, Favorite, RideStatusEnum
-from werkzeug.security import generate_password_hash
-from datetime import datetime, timedelta  # Add timedelta import here
+from passwords import password_hasher
+
+HOSPITALS = ["City Hospital", "Greenwood Hospital", "Kenyatta National Hospital", "Nairobi Hospital",
+             "Aga Khan University Hospital", "MP Shah Hospital", "Mater Hospital", "Karen Hospital",
+             "Gertrude's Children's Hospital", "Nairobi West Hospital", "Mbagathi County Hospital",
+             "Mama Lucy Kibaki Hospital"]
+PAYMENT_METHODS = ["Cash", "M-Pesa", "Credit Card", "Insurance"]
+FIRST_NAMES = ["Joy", "Brian", "Alice", "Tom", "Wanjiru", "Otieno", "Achieng", "Kamau", "Njeri", "Mwangi",
+               "Akinyi", "Kiprono", "Chebet", "Mutua", "Nduta", "Omondi", "Wambui", "Kibet", "Atieno", "Muriithi"]
+LAST_NAMES = ["Mutanu", "Lunga", "Wambui", "Muriithi", "Kariuki", "Odhiambo", "Njoroge", "Kiptoo", "Wekesa",
+              "Onyango", "Gitau", "Chege", "Kilonzo", "Owino", "Macharia", "Rotich", "Nyambura", "Ochieng"]
+MESSAGES = ["I have a suggestion to improve the ambulance service.",
+            "I had a great experience using the ambulance service, thank you!",
+            "The ambulance took longer than expected to arrive.",
+            "Please add more hospitals near my area.",
+            "How do I update my payment method?"]
+
+SAMPLE_USERS = [("Joy Mutanu", "joy.mutanu@example.com"), ("Brian Lunga", "brian.lunga@example.com")]
+
 
-# Clear existing data from the tables
 def clear_data():
-    # Delete all entries from each table
-    db.session.query(Favorite).delete()
-    db.session.query(RideHistory).delete()
-    db.session.query(ContactUs).delete()
-    db.session.query(User).delete()
+    # Children first, so foreign keys never point at deleted users
+    for model in (Favorite, RideHistory, ContactUs, User):
+        db.session.execute(delete(model))
     db.session.commit()
 
-def seed_data():
-    # This is necessary to run the seed script
-    with app.app_context():  # Ensures the app context is available for DB interactions
-        clear_data()
 
-        # ----------------- SEED DATA -----------------
-        # Create sample users
-        user1 = User(
-            name="Joy Mutanu",
-            email="joy.mutanu@example.com",
-            password_hash=generate_password_hash('password123')
-        )
-
-        user2 = User(
-            name="Brian Lunga",
-            email="brian.lunga@example.com",
-            password_hash=generate_password_hash('password123')
-        )
-
-        # Add users to the session
-        db.session.add(user1)
-        db.session.add(user2)
-
-        # Commit to save users to the database
-        db.session.commit()
+def insert_batches(model, rows, batch_size):
+    # Drain a row generator into executemany INSERTs of batch_size rows each. Inserting
+    # into the Table rather than the mapped class skips the ORM's per-row bookkeeping.
+    statement = insert(model.__table__)
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            db.session.execute(statement, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(statement, batch)
+        count += len(batch)
+    return count
 
-        # ----------------- SEED RIDE HISTORY -----------------
-        
-        ride1 = RideHistory(
-            user_id=user1.id,
-            hospital_name="City Hospital",
-            payment_method="Credit Card",
-            date=datetime.utcnow() - timedelta(days=2)  # 2 days ago
-        )
-
-        ride2 = RideHistory(
-            user_id=user2.id,
-            hospital_name="Greenwood Hospital",
-            payment_method="Cash",
-            date=datetime.utcnow() - timedelta(hours=5)  # 5 hours ago
-        )
-
-        # Add ride histories to the session
-        db.session.add(ride1)
-        db.session.add(ride2)
-
-        # Commit to save ride histories to the database
-        db.session.commit()
 
-        # ----------------- SEED CONTACT MESSAGES -----------------
+def generate_users(rng, start, count, password_hash):
+    for i in range(start, start + count):
+        yield {"name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+               "email": f"loadtest{i}@example.com", "password_hash": password_hash}
 
-        contact1 = ContactUs(
-            name="Alice Wambui",
-            email="alice.wambui@example.com",
-            phone_number="0712345678",
-            message="I have a suggestion to improve the ambulance service."
-        )
 
-        contact2 = ContactUs(
-            name="Tom Muriithi",
-            email="tom.muriithi@example.com",
-            phone_number="0723456789",
-            message="I had a great experience using the ambulance service, thank you!"
-        )
+def generate_rides(rng, user_ids, per_user, end):
+    statuses = list(RideStatusEnum)
+    for user_id in user_ids:
+        for _ in range(per_user):
+            yield {"user_id": user_id, "hospital_name": rng.choice(HOSPITALS),
+                   "payment_method": rng.choice(PAYMENT_METHODS), "status": rng.choice(statuses),
+                   "date": end - timedelta(seconds=rng.randrange(365 * 24 * 3600))}
 
-        # Add contact messages to the session
-        db.session.add(contact1)
-        db.session.add(contact2)
 
-        # Commit to save contact messages to the database
-        db.session.commit()
+def generate_favorites(rng, user_ids, per_user):
+    for user_id in user_ids:
+        for name in rng.sample(HOSPITALS, min(per_user, len(HOSPITALS))):
+            yield {"user_id": user_id, "hospital_name": name}
+
 
-        # ----------------- SEED FAVORITES -----------------
+def generate_contacts(rng, count, end):
+    for _ in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {"name": f"{first} {last}", "email": f"{first}.{last}@example.com".lower(),
+               "phone_number": f"07{rng.randrange(10 ** 8):08d}", "message": rng.choice(MESSAGES),
+               "created_at": end - timedelta(seconds=rng.randrange(365 * 24 * 3600))}
 
-        favorite1 = Favorite(
-            user_id=user1.id,
-            hospital_name="City Hospital"
-        )
 
-        favorite2 = Favorite(
-            user_id=user2.id,
-            hospital_name="Greenwood Hospital"
-        )
+def seed_data():
+    # The small sample data set used in development
+    with app.app_context():
+        clear_data()
+        password_hash = password_hasher.hash('password123')
+        db.session.execute(insert(User), [{"name": name, "email": email, "password_hash": password_hash}
+                                          for name, email in SAMPLE_USERS])
+        user1, user2 = db.session.execute(
+            select(User.id).where(User.email.in_([email for _, email in SAMPLE_USERS])).order_by(User.id)
+        ).scalars().all()
+        now = datetime.utcnow()
+        db.session.execute(insert(RideHistory), [
+            {"user_id": user1, "hospital_name": "City Hospital", "payment_method": "Credit Card",
+             "date": now - timedelta(days=2)},
+            {"user_id": user2, "hospital_name": "Greenwood Hospital", "payment_method": "Cash",
+             "date": now - timedelta(hours=5)},
+        ])
+        db.session.execute(insert(ContactUs), [
+            {"name": "Alice Wambui", "email": "alice.wambui@example.com", "phone_number": "0712345678",
+             "message": MESSAGES[0]},
+            {"name": "Tom Muriithi", "email": "tom.muriithi@example.com", "phone_number": "0723456789",
+             "message": MESSAGES[1]},
+        ])
+        db.session.execute(insert(Favorite), [{"user_id": user1, "hospital_name": "City Hospital"},
+                                              {"user_id": user2, "hospital_name": "Greenwood Hospital"}])
+        db.session.commit()
+        print("Database seeded successfully!")
 
-        # Add favorites to the session
-        db.session.add(favorite1)
-        db.session.add(favorite2)
 
-        # Commit to save favorites to the database
+def seed_synthetic(users, rides_per_user, favorites_per_user, contacts, seed=42, batch_size=5000,
+                   end=None, clear=False):
+    rng = random.Random(seed)
+    end = end or datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    started = time.perf_counter()
+    with app.app_context():
+        if clear:
+            clear_data()
+        # Every synthetic user shares one password, so it is hashed once rather than per user
+        password_hash = password_hasher.hash('password123')
+        start = db.session.execute(
+            select(func.count()).select_from(User).where(User.email.like('loadtest%@example.com'))
+        ).scalar()
+
+        totals = {"users": 0, "rides": 0, "favorites": 0, "contacts": 0}
+        for offset in range(0, users, batch_size):
+            count = min(batch_size, users - offset)
+            last_id = db.session.execute(select(func.coalesce(func.max(User.id), 0))).scalar()
+            totals["users"] += insert_batches(User, generate_users(rng, start + offset, count, password_hash),
+                                              batch_size)
+            user_ids = db.session.execute(
+                select(User.id).where(User.id > last_id).order_by(User.id)
+            ).scalars().all()
+            totals["rides"] += insert_batches(RideHistory, generate_rides(rng, user_ids, rides_per_user, end),
+                                              batch_size)
+            totals["favorites"] += insert_batches(Favorite, generate_favorites(rng, user_ids, favorites_per_user),
+                                                  batch_size)
+            db.session.commit()
+            print(f"  {totals['users']}/{users} users", end="\r", flush=True)
+
+        if users:
+            print()
+        totals["contacts"] = insert_batches(ContactUs, generate_contacts(rng, contacts, end), batch_size)
         db.session.commit()
 
-        print("Database seeded successfully!")
+    elapsed = time.perf_counter() - started
+    rows = sum(totals.values())
+    print(f"Added {totals['users']} users, {totals['rides']} rides, {totals['favorites']} favorites and "
+          f"{totals['contacts']} contact messages in {elapsed:.1f} s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
 
-# Call seed_data() to run the script
 if __name__ == '__main__':
-    seed_data()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=0,
+                        help="generate this many synthetic users instead of loading the sample data")
+    parser.add_argument("--rides-per-user", type=int, default=20)
+    parser.add_argument("--favorites-per-user", type=int, default=3)
+    parser.add_argument("--contacts", type=int, default=0, help="synthetic contact messages")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per executemany INSERT")
+    parser.add_argument("--end-date", type=datetime.fromisoformat,
+                        help="latest generated timestamp (default: today 00:00 UTC); dates go back a year")
+    parser.add_argument("--clear", action="store_true", help="delete existing data first")
+    args = parser.parse_args()
+
+    if args.users or args.contacts:
+        seed_synthetic(args.users, args.rides_per_user, args.favorites_per_user, args.contacts, args.seed,
+                       args.batch_size, args.end_date, args.clear)
+    else:
+        seed_data()
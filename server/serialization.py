@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+# Ride times are stored in UTC and shown in East Africa Time (Kenya)
+LOCAL_OFFSET = timedelta(hours=3)
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def format_local_date(value):
+    # Same output as (value + LOCAL_OFFSET).strftime("%b %d, %Y %I:%M %p"), minus the per-call format parsing
+    if value is None:
+        return None
+    local = value + LOCAL_OFFSET
+    hour = local.hour % 12 or 12
+    return (f"{MONTHS[local.month - 1]} {local.day:02d}, {local.year} "
+            f"{hour:02d}:{local.minute:02d} {'PM' if local.hour >= 12 else 'AM'}")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson.
+
+    Keys are sorted and responses end in a newline, as with the default
+    provider, so ASCII payloads encode to the same bytes. Non-ASCII text is
+    written as raw UTF-8 where the default provider (``ensure_ascii=True``)
+    writes ``\\uXXXX`` escapes. The decoded JSON is the same, but the bytes,
+    lengths and ETags of such responses differ from the stock encoder's.
+    """
+
+    # Dates go through default() like the stock provider, which renders them as HTTP dates
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.option | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=option),
+                                        mimetype=self.mimetype)
@@ -0,0 +1,140 @@
+"""Synthetic fleet and request-storm simulator for the dispatcher.
+
+By default everything runs in memory against ``dispatch.assign``; with
+``--database`` a fleet and a backlog of pending rides are written to the app
+database instead, ready for ``flask dispatch-worker`` to chew through.
+
+    python simulate.py --ambulances 500 --requests 20000 --duration 600
+    python simulate.py --database --ambulances 200 --requests 5000
+"""
+import argparse
+import heapq
+import math
+import random
+import time
+
+from dispatch import assign
+from ranking import DEFAULT_SPEED_KMH
+from spatial import KM_PER_DEGREE
+
+NAIROBI = (-1.2921, 36.8219)
+
+
+def random_point(rng, center, spread_km):
+    # Uniform over a disc of radius spread_km around center
+    distance = spread_km * math.sqrt(rng.random())
+    bearing = rng.uniform(0, 2 * math.pi)
+    lat = center[0] + distance * math.cos(bearing) / KM_PER_DEGREE
+    lng = center[1] + distance * math.sin(bearing) / (KM_PER_DEGREE * math.cos(math.radians(center[0])))
+    return lat, lng
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def simulate(ambulances, requests, duration, tick, batch_size, spread_km, seed):
+    rng = random.Random(seed)
+    free_units = {i: random_point(rng, NAIROBI, spread_km) for i in range(ambulances)}
+    busy_until = []  # heap of (sim time the unit is free again, unit id)
+
+    arrivals = sorted(rng.uniform(0, duration) for _ in range(requests))
+    arrivals = [(t, i, random_point(rng, NAIROBI, spread_km)) for i, t in enumerate(arrivals)]
+    pending = []  # heap of (arrival time, request id, position): oldest first
+    next_arrival = 0
+
+    cycle_ms, waits, pickup_km = [], [], []
+    max_queue = 0
+    now = 0.0
+    while next_arrival < len(arrivals) or pending:
+        while next_arrival < len(arrivals) and arrivals[next_arrival][0] <= now:
+            heapq.heappush(pending, arrivals[next_arrival])
+            next_arrival += 1
+        while busy_until and busy_until[0][0] <= now:
+            _, unit = heapq.heappop(busy_until)
+            free_units[unit] = random_point(rng, NAIROBI, spread_km)  # drop-off somewhere in the city
+        max_queue = max(max_queue, len(pending))
+
+        batch = [heapq.heappop(pending) for _ in range(min(batch_size, len(pending)))]
+        started = time.perf_counter()
+        pairs = assign([(i, lat, lng) for _, i, (lat, lng) in batch],
+                       [(u, lat, lng) for u, (lat, lng) in free_units.items()])
+        if batch:
+            cycle_ms.append((time.perf_counter() - started) * 1000)
+
+        assigned = {request_id: (unit, distance) for request_id, unit, distance in pairs}
+        for arrived_at, request_id, position in batch:
+            if request_id not in assigned:
+                heapq.heappush(pending, (arrived_at, request_id, position))
+                continue
+            unit, distance = assigned[request_id]
+            del free_units[unit]
+            travel = distance / DEFAULT_SPEED_KMH * 3600
+            heapq.heappush(busy_until, (now + travel + rng.uniform(600, 1800), unit))
+            waits.append(now - arrived_at)
+            pickup_km.append(distance)
+
+        now += tick
+
+    print(f"Dispatched {len(waits)} requests with {ambulances} ambulances over {now:.0f} simulated seconds")
+    print(f"Dispatch cycle: {len(cycle_ms)} cycles, p50 {percentile(cycle_ms, 50):.2f} ms, "
+          f"p95 {percentile(cycle_ms, 95):.2f} ms, max {max(cycle_ms or [0]):.2f} ms")
+    print(f"Queue wait: p50 {percentile(waits, 50):.0f} s, p95 {percentile(waits, 95):.0f} s, "
+          f"max queue {max_queue}")
+    print(f"Pickup distance: mean {sum(pickup_km) / max(len(pickup_km), 1):.2f} km, "
+          f"p95 {percentile(pickup_km, 95):.2f} km")
+
+
+def seed_database(ambulances, requests, spread_km, seed):
+    from sqlalchemy import insert
+    from app import app
+    from models import db, User, Ambulance, RideHistory
+    from passwords import password_hasher
+
+    rng = random.Random(seed)
+    with app.app_context():
+        user = User.query.filter_by(email="simulator@example.com").first()
+        if not user:
+            user = User(name="Dispatch Simulator", email="simulator@example.com",
+                        password_hash=password_hasher.hash("simulator"))
+            db.session.add(user)
+            db.session.commit()
+
+        start = Ambulance.query.count()
+        fleet = []
+        for i in range(ambulances):
+            lat, lng = random_point(rng, NAIROBI, spread_km)
+            fleet.append({"vehicle_no": f"SIM {start + i:05d}", "latitude": lat, "longitude": lng,
+                          "is_available": True})
+        rides = []
+        for _ in range(requests):
+            lat, lng = random_point(rng, NAIROBI, spread_km)
+            rides.append({"user_id": user.id, "hospital_name": "Simulated Hospital", "payment_method": "Cash",
+                          "pickup_latitude": lat, "pickup_longitude": lng})
+
+        db.session.execute(insert(Ambulance), fleet)
+        db.session.execute(insert(RideHistory), rides)
+        db.session.commit()
+        print(f"Added {ambulances} ambulances and {requests} pending rides; run `flask dispatch-worker` to dispatch them")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ambulances", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--duration", type=float, default=600, help="storm length in simulated seconds")
+    parser.add_argument("--tick", type=float, default=1.0, help="simulated seconds between dispatch cycles")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--spread-km", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", action="store_true", help="seed the app database instead of simulating")
+    args = parser.parse_args()
+
+    if args.database:
+        seed_database(args.ambulances, args.requests, args.spread_km, args.seed)
+    else:
+        simulate(args.ambulances, args.requests, args.duration, args.tick, args.batch_size,
+                 args.spread_km, args.seed)
@@ -0,0 +1,96 @@
+import heapq
+import math
+import threading
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = (math.sin(dlat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class HospitalIndex:
+    # Fixed-size lat/lng grid. Each cell holds (lat, lng, payload) tuples, and a
+    # nearby query walks rings of cells outwards from the query point until the
+    # k-th best distance is closer than anything the next ring could contain.
+
+    def __init__(self, cell_size_deg=0.05):
+        self.cell_size_deg = cell_size_deg
+        self._cells = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def _cell(self, lat, lng):
+        return (int(math.floor(lat / self.cell_size_deg)),
+                int(math.floor(lng / self.cell_size_deg)))
+
+    def load(self, hospitals):
+        # Build a fresh grid and swap it in, so readers never see a half-built index
+        cells = {}
+        count = 0
+        for hospital in hospitals:
+            entry = (hospital.latitude, hospital.longitude, hospital.to_dict())
+            cells.setdefault(self._cell(hospital.latitude, hospital.longitude), []).append(entry)
+            count += 1
+        with self._lock:
+            self._cells = cells
+            self._count = count
+
+    def add(self, hospital):
+        entry = (hospital.latitude, hospital.longitude, hospital.to_dict())
+        with self._lock:
+            self._cells.setdefault(self._cell(hospital.latitude, hospital.longitude), []).append(entry)
+            self._count += 1
+
+    def nearby(self, lat, lng, radius_km=10.0, limit=20):
+        cells = self._cells
+        if not cells or limit <= 0:
+            return []
+
+        # Smallest cell edge in km around the query point (longitude shrinks towards the poles)
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + self.cell_size_deg, 90.0))), 0.01)
+        cell_km = self.cell_size_deg * KM_PER_DEGREE * cos_lat
+        max_ring = int(math.ceil(radius_km / cell_km)) + 1
+
+        center_row, center_col = self._cell(lat, lng)
+        best = []  # max-heap of (-distance, tiebreak, payload)
+        tiebreak = 0
+
+        for ring in range(max_ring + 1):
+            for row, col in _ring_cells(center_row, center_col, ring):
+                for h_lat, h_lng, payload in cells.get((row, col), ()):
+                    distance = haversine_km(lat, lng, h_lat, h_lng)
+                    if distance > radius_km:
+                        continue
+                    tiebreak += 1
+                    if len(best) < limit:
+                        heapq.heappush(best, (-distance, tiebreak, payload))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, tiebreak, payload))
+
+            # Anything in the next ring is at least `ring` whole cells away
+            if len(best) == limit and -best[0][0] <= ring * cell_km:
+                break
+
+        results = sorted(((-d, payload) for d, _, payload in best), key=lambda item: item[0])
+        return [dict(payload, distance=round(distance, 2)) for distance, payload in results]
+
+
+def _ring_cells(center_row, center_col, ring):
+    if ring == 0:
+        yield center_row, center_col
+        return
+    for col in range(center_col - ring, center_col + ring + 1):
+        yield center_row - ring, col
+        yield center_row + ring, col
+    for row in range(center_row - ring + 1, center_row + ring):
+        yield row, center_col - ring
+        yield row, center_col + ring
@@ -0,0 +1,158 @@
+"""Precompress the built React client for the static file server.
+
+Writes a .gz and, when the brotli package is installed, a .br file next to
+every compressible file of the Vite build, keeping only variants that are
+meaningfully smaller. build.sh runs it after `npm run build`; the server
+picks the variants up when it starts.
+
+    python static_assets.py ../client/dist
+"""
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from collections import namedtuple
+
+from flask import Response, request
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Vite emits bundles as assets/<name>-<8 character content hash>.<ext>, so a URL's content never changes
+HASHED_ASSET = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8}\.\w+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+COMPRESSIBLE = (".html", ".js", ".mjs", ".css", ".json", ".map", ".svg", ".txt", ".xml", ".ico", ".wasm")
+MIN_COMPRESS_SIZE = 1024
+# In order of preference when the client accepts several
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# A file as sent for one Content-Encoding (None = identity); body is set when it is held in memory
+Variant = namedtuple("Variant", "path body size etag")
+Asset = namedtuple("Asset", "mimetype cache_control variants")
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class StaticAssets:
+    """The built client, indexed once at startup.
+
+    Requests are answered from an in-memory manifest, so a miss costs no
+    filesystem calls and a hit only opens the file. Precompressed variants
+    are chosen by Accept-Encoding. Hashed Vite bundles are cached as
+    immutable for a year, and everything else is revalidated by ETag.
+    index.html, the fallback for every client-side route, is kept in memory.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+        self.index = None
+
+    def load(self):
+        assets = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            names = set(filenames)
+            for name in filenames:
+                if name[-3:] in (".br", ".gz") and name[:-3] in names:
+                    continue
+                path = os.path.join(dirpath, name)
+                url_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+                assets[url_path] = self._load_asset(url_path, path, names)
+        self.assets = assets
+        self.index = assets.get("index.html")
+        return len(assets)
+
+    def _load_asset(self, url_path, path, names):
+        mimetype = mimetypes.guess_type(url_path)[0] or "application/octet-stream"
+        cache_control = IMMUTABLE if HASHED_ASSET.match(url_path) else REVALIDATE
+        in_memory = url_path == "index.html"
+        variants = {}
+        for encoding, suffix in ((None, ""),) + ENCODINGS:
+            if encoding and os.path.basename(path) + suffix not in names:
+                continue
+            with open(path + suffix, "rb") as f:
+                data = f.read()
+            etag = _digest(data) + (f"-{encoding}" if encoding else "")
+            variants[encoding] = Variant(path + suffix, data if in_memory else None, len(data), etag)
+        if in_memory and "gzip" not in variants and len(variants[None].body) >= MIN_COMPRESS_SIZE:
+            body = gzip.compress(variants[None].body, mtime=0)
+            variants["gzip"] = Variant(None, body, len(body), variants[None].etag + "-gzip")
+        return Asset(mimetype, cache_control, variants)
+
+    def response(self, path):
+        # The response for a request path, or None for a 404. Unknown paths get index.html
+        # so client-side routes work, except under assets/ where that would be served as a bundle.
+        asset = self.assets.get(path)
+        if asset is None:
+            if path.startswith("assets/"):
+                return None
+            asset = self.index
+            if asset is None:
+                return None
+
+        variant = asset.variants[None]
+        encoding = None
+        if len(asset.variants) > 1:
+            for name, _ in ENCODINGS:
+                if name in asset.variants and request.accept_encodings.quality(name) > 0:
+                    variant, encoding = asset.variants[name], name
+                    break
+
+        if request.if_none_match.contains(variant.etag):
+            response = Response(status=304)
+        elif variant.body is not None:
+            response = Response(variant.body, mimetype=asset.mimetype)
+        else:
+            response = Response(wrap_file(request.environ, open(variant.path, "rb")),
+                                mimetype=asset.mimetype, direct_passthrough=True)
+            response.content_length = variant.size
+        response.set_etag(variant.etag)
+        response.headers["Cache-Control"] = asset.cache_control
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if len(asset.variants) > 1:
+            response.vary.add("Accept-Encoding")
+        return response
+
+
+def compress(root, min_size=MIN_COMPRESS_SIZE, max_ratio=0.9):
+    # Returns the number of variants written
+    compressors = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors[".br"] = lambda data: brotli.compress(data, quality=11)
+    written = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+            for suffix, compressor in compressors.items():
+                compressed = compressor(data)
+                if len(compressed) <= len(data) * max_ratio:
+                    with open(path + suffix, "wb") as f:
+                        f.write(compressed)
+                    written += 1
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", nargs="?", default=os.path.join(os.path.dirname(__file__), "..", "client", "dist"),
+                        help="Vite output directory (default: ../client/dist)")
+    args = parser.parse_args()
+    written = compress(args.root)
+    print(f"Wrote {written} compressed variants under {args.root}"
+          + ("" if brotli else " (gzip only: install brotli for .br)"))
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+
+class CachedUser:
+    # Read-only snapshot of a User, safe to share between requests and threads
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getattr__(self, name):
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class UserCache:
+    """Process-local LRU of user snapshots keyed by id.
+
+    Updates and deletes through the ORM evict the entry in this process; the TTL
+    bounds how long another gunicorn worker can keep serving an old snapshot.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, load):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        user = load(user_id)
+        if user is None:
+            return None
+        snapshot = CachedUser(user.to_dict())
+        with self._lock:
+            self._entries[user_id] = (now, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def watch(self, user_model):
+        # Evict at flush, and again after commit so a read racing the commit
+        # cannot leave the pre-update row cached
+        def mark(mapper, connection, target):
+            self.invalidate(target.id)
+            session = object_session(target)
+            if session is not None:
+                session.info.setdefault("user_cache_invalidate", set()).add(target.id)
+
+        def after_commit(session):
+            for user_id in session.info.pop("user_cache_invalidate", ()):
+                self.invalidate(user_id)
+
+        event.listen(user_model, "after_update", mark)
+        event.listen(user_model, "after_delete", mark)
+        event.listen(Session, "after_commit", after_commit)
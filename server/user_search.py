@@ -0,0 +1,95 @@
+import logging
+import re
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+logger = logging.getLogger(__name__)
+
+# No search goes deeper than this many results, however it is paginated
+MAX_SEARCH_RESULTS = 500
+
+SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS user_fts USING fts5(
+        name, content='user', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS user_fts_insert AFTER INSERT ON "user" BEGIN
+        INSERT INTO user_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_fts_delete AFTER DELETE ON "user" BEGIN
+        INSERT INTO user_fts(user_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_fts_update AFTER UPDATE OF name ON "user" BEGIN
+        INSERT INTO user_fts(user_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO user_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+]
+
+POSTGRES_TRGM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    'CREATE INDEX IF NOT EXISTS ix_user_name_trgm ON "user" USING gin (name gin_trgm_ops)',
+]
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Keep Alembic autogenerate from proposing to drop the FTS5 table and its shadow tables
+    return not (type_ == "table" and reflected and compare_to is None and name.startswith("user_fts"))
+
+
+class UserSearch:
+    # Name search backed by an FTS5 table on SQLite or a pg_trgm GIN index on
+    # Postgres. Both are maintained by the database itself (triggers / index),
+    # so every insert or rename through any code path stays searchable.
+
+    def __init__(self, user_model):
+        self.User = user_model
+        self.mode = "like"
+
+    def setup(self, engine):
+        try:
+            if engine.dialect.name == "sqlite":
+                with engine.begin() as conn:
+                    created = conn.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_fts'"
+                    )).first() is None
+                    for statement in SQLITE_FTS_DDL:
+                        conn.execute(text(statement))
+                    if created:
+                        # Index the users that existed before the triggers did
+                        conn.execute(text("INSERT INTO user_fts(user_fts) VALUES ('rebuild')"))
+                self.mode = "fts5"
+            elif engine.dialect.name == "postgresql":
+                with engine.begin() as conn:
+                    for statement in POSTGRES_TRGM_DDL:
+                        conn.execute(text(statement))
+                self.mode = "trgm"
+        except (OperationalError, ProgrammingError):
+            logger.warning("Indexed user search unavailable, falling back to LIKE scans", exc_info=True)
+            self.mode = "like"
+
+    def search(self, session, query, limit=20, offset=0):
+        User = self.User
+        limit = max(0, min(limit, MAX_SEARCH_RESULTS - offset))
+        if limit == 0:
+            return []
+
+        if self.mode == "fts5":
+            tokens = _TOKEN.findall(query)
+            if not tokens:
+                return []
+            # Every word must match the start of a word in the name: "joy mut" -> "joy"* "mut"*
+            match = " ".join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+            statement = select(User).from_statement(text(
+                'SELECT "user".* FROM user_fts JOIN "user" ON "user".id = user_fts.rowid '
+                'WHERE user_fts MATCH :match ORDER BY user_fts.rank, "user".id LIMIT :limit OFFSET :offset'
+            ))
+            return session.execute(statement, {"match": match, "limit": limit, "offset": offset}).scalars().all()
+
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        # ILIKE '%...%' is what the pg_trgm GIN index accelerates
+        condition = (User.name.ilike(f"%{escaped}%", escape="\\") if self.mode == "trgm"
+                     else User.name.contains(query, autoescape=True))
+        statement = select(User).where(condition).order_by(User.id).limit(limit).offset(offset)
+        return session.execute(statement).scalars().all()